@@ -1,250 +1,384 @@
+import asyncio
 import os
-import requests
 import json
 import re
-import pandas as pd
 import shutil
-import fitz  # PyMuPDF to handle PDF files
+from typing import NamedTuple
+from functools import partial
 from io import BytesIO
-from bs4 import BeautifulSoup
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from youtube_transcript_api import YouTubeTranscriptApi
-from langchain_groq import ChatGroq
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from app.api.core.database.db import get_students,add_student_to_db  # Fetch student data
-from langchain_huggingface import HuggingFaceEmbeddings  # Updated import
-from langchain_community.vectorstores import FAISS
+from app.api.core.database.db import get_student_by_id  # Fetch student data
+from app.api.core.name_index import student_names
+from app.api.core.student_query import build_student_context
+from app.api.core.student_import import import_students_from_excel, EXCEL_IMPORT_BATCH_SIZE
+from app.api.core.uploads import spool_upload, remove_upload
+from app.api.core.jobs import job_manager, JobQueueFull
+from app.api.routes.jobs import submit_job
+from app.api.core.vector_store import VECTOR_STORE_DIRECTORY
+from app.api.core.knowledge_stores import KnowledgeStores, SHARED_SCOPE
+from app.api.core.ai_models import get_llm, embeddings, warm_up
+from app.api.core.pdf_pipeline import ingest_pdf
+from app.api.core.web_fetch import fetch_page_text, FetchError
+from app.api.core.transcripts import transcripts, chunk_by_time, format_timestamp
+from app.api.core.llm_cache import ResponseCache
+from app.api.core.faq import FAQEngine
+from app.api.core.concurrency import llm_limiter, run_embedding, run_embedding_job, Overloaded
+from app.api.core.metrics import span
 from langchain.text_splitter import CharacterTextSplitter
 
-UPLOAD_DIRECTORY = "uploads"
-if not os.path.exists(UPLOAD_DIRECTORY):
-    os.makedirs(UPLOAD_DIRECTORY)
+# The Groq model and HuggingFace embeddings are loaded lazily (see ai_models), so importing
+# this module does not pull in torch; `embeddings` loads the real model on first use
 
-# Load FAQ data
-with open("faq.json", "r") as file:
-    FAQ_DATA = json.load(file)
+# Persistent FAISS indexes per user or collection, loaded on demand and evicted LRU
+knowledge = KnowledgeStores(VECTOR_STORE_DIRECTORY, embeddings)
 
-# Load API key from environment variables
-GROQ_API_KEY=os.getenv("GROQ_API_KEY"),
-# Initialize Groq model
-llm = ChatGroq(model_name="llama3-8b-8192")
+# FAQ answers matched by meaning, reloaded when faq.json changes
+faq = FAQEngine(embeddings=embeddings)
 
-# Initialize HuggingFace embeddings with a specified model name
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Chunks sent to the LLM as retrieved context
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "2"))
 
-# Global in-memory storage for the session
-vector_db = None
-stored_content = ""
+# Most recently ingested content per scope, used for summarization
+stored_content = {}
 
-def store_text_in_faiss(text):
-    """Splits and stores text in FAISS vector storage."""
-    global vector_db
-    try:
-        text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        documents = text_splitter.create_documents([text])
-        vector_db = FAISS.from_documents(documents, embeddings)
-        print("Text stored in FAISS successfully.")
-    except Exception as e:
-        print(f"Error storing text in FAISS: {str(e)}")
+# Cache of LLM answers keyed by prompt template, context and query
+response_cache = ResponseCache(embeddings=embeddings)
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+PROMPT_TEMPLATES = {
+    "general": "Query: {query}",
+    "context": "Context: {context}\nQuery: {query}",
+    "summarize": "Context: {context}\nQuery: Summarize the content in 20 words.",
+}
+
+def build_messages(template, query, context=""):
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=PROMPT_TEMPLATES[template].format(context=context, query=query)),
+    ]
+
+class LLMPrompt(NamedTuple):
+    template: str
+    query: str
+    context: str = ""
+
+def _cache_query(template, query):
+    return "" if template == "summarize" else query  # The summary depends only on the content
+
+async def _cached_response(template, query, context):
+    # Semantic lookups embed the query, so they run on the embedding executor
+    if response_cache.semantic_enabled:
+        return await run_embedding(response_cache.get, template, context, _cache_query(template, query))
+    return response_cache.get(template, context, _cache_query(template, query))
+
+async def _cache_response(template, query, context, response):
+    if response_cache.semantic_enabled:
+        await run_embedding(response_cache.put, template, context, _cache_query(template, query), response)
+    else:
+        response_cache.put(template, context, _cache_query(template, query), response)
+
+async def ask_llm(template, query, context=""):
+    """Answers a prompt, reusing a cached answer for the same (or a near-duplicate) question."""
+    cached = await _cached_response(template, query, context)
+    if cached is not None:
+        return cached
+    async with llm_limiter:
+        with span("llm.invoke"):
+            response = await get_llm().ainvoke(build_messages(template, query, context))
+    await _cache_response(template, query, context, response.content)
+    return response.content
+
+async def stream_llm(template, query, context=""):
+    """Yields answer tokens from the model's async stream; cached answers arrive in one piece."""
+    cached = await _cached_response(template, query, context)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    async with llm_limiter:
+        with span("llm.stream"):
+            async for chunk in get_llm().astream(build_messages(template, query, context)):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+    await _cache_response(template, query, context, "".join(parts))
+
+def store_text_in_faiss(text, document_id, scope=SHARED_SCOPE):
+    """Splits text and stores it in the scope's FAISS index, replacing any earlier copy of the document.
+
+    Errors propagate, so the ingestion job that called it ends failed.
+    """
+    text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    chunks = text_splitter.split_text(text)
+    with knowledge.checkout(scope) as store:
+        store.replace_document(document_id, chunks)
+        store.save()
+    print("Text stored in FAISS successfully.")
 
-def retrieve_relevant_info(query):
-    """Retrieves relevant context from stored FAISS vectors."""
-    global vector_db
-    if vector_db:
+def _cite(doc):
+    """Prefixes video chunks with their time offset so answers can point to it."""
+    if "video_id" in doc.metadata:
+        return f"[{doc.metadata['source']} at {format_timestamp(doc.metadata['start'])}] {doc.page_content}"
+    return doc.page_content
+
+def has_knowledge(scope, document_id=None):
+    """Whether the scope's index holds any chunks (or the given document)."""
+    with knowledge.checkout(scope) as store:
+        return store.has_document(document_id) if document_id else len(store) > 0
+
+def retrieve_relevant_info(query, scope=SHARED_SCOPE, k=RETRIEVAL_K, metadata_filter=None):
+    """Retrieves relevant context from the scope's index with hybrid (BM25 + vector) search."""
+    with knowledge.checkout(scope) as store:
+        if not len(store):
+            return ""
         try:
-            docs = vector_db.similarity_search(query, k=2)
-            context = " ".join([doc.page_content for doc in docs])
+            docs = store.hybrid_search(query, k=k, metadata_filter=metadata_filter)
+            context = " ".join([_cite(doc) for doc in docs])
             print(f"Retrieved context: {context}")
             return context
         except Exception as e:
             print(f"Error retrieving info from FAISS: {str(e)}")
-    return ""
+            return ""
 
-def get_student_info(name: str):
+async def get_student_info(name: str):
     """Fetch student details from the database."""
-    students = get_students()
-    print(f"Available students: {[student['name'] for student in students]}")  # Debugging line
-    for student in students:
-        if student["name"].strip().lower() == name.strip().lower():
-            return student
-    return None
-
-def fetch_and_parse_url(url):
-    """Fetches and extracts main content from a given URL."""
-    global stored_content
+    student_ids = student_names.lookup(name)
+    return await get_student_by_id(student_ids[0]) if student_ids else None
+
+async def fetch_and_parse_url(url, scope=SHARED_SCOPE):
+    """Fetches a page's main text and stores it in FAISS, skipping unchanged pages."""
+    document_id = f"url:{url}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content_div = soup.find('div', {'id': 'mw-content-text'}) or soup.find('article')
-        if content_div:
-            text_content = ' '.join(para.get_text() for para in content_div.find_all('p'))
-            stored_content = text_content[:2000]
-            store_text_in_faiss(stored_content)
-            return {"message": "URL content stored successfully."}
-    except Exception as e:
+        page = await fetch_page_text(url)
+    except FetchError as e:
         print(f"Error fetching and parsing URL: {str(e)}")
         return {"error": str(e)}
+    if not page.text:
+        return {"error": "No readable content found at the URL."}
+    stored_content[scope] = page.text[:2000]
+    if page.not_modified and await asyncio.to_thread(has_knowledge, scope, document_id):
+        return {"message": "URL content is unchanged and already stored."}
+    await run_embedding_job(store_text_in_faiss, page.text, document_id, scope)
+    return {"message": "URL content stored successfully."}
+
+def _store_chunks(scope, document_id, texts, metadatas):
+    with knowledge.checkout(scope) as store:
+        store.replace_document(document_id, texts, metadatas)
+        store.save()
 
-def fetch_transcript(video_id):
-    """Fetches transcript from a YouTube video."""
-    global stored_content
+async def fetch_transcript(video_id, scope=SHARED_SCOPE):
+    """Indexes a YouTube transcript in time-window chunks, unless the video is already indexed."""
+    document_id = f"youtube:{video_id}"
+    if await asyncio.to_thread(has_knowledge, scope, document_id):
+        return {"message": "Video transcript is already indexed."}
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        video_transcript = "\n".join([part['text'] for part in transcript])
-        stored_content = video_transcript
-        store_text_in_faiss(stored_content)
-        return {"message": "Video transcript stored successfully."}
+        segments = await asyncio.to_thread(transcripts.get, video_id)
     except Exception as e:
         print(f"Error fetching transcript: {str(e)}")
         return {"error": "Could not retrieve the transcript. Please ensure the video has subtitles enabled."}
+    chunks = chunk_by_time(segments)
+    if not chunks:
+        return {"error": "The transcript is empty."}
+    texts = [text for text, _ in chunks]
+    metadatas = [{"source": f"https://youtu.be/{video_id}", "video_id": video_id, **window} for _, window in chunks]
+    await run_embedding_job(_store_chunks, scope, document_id, texts, metadatas)
+    stored_content[scope] = "\n".join(texts)
+    return {"message": "Video transcript stored successfully."}
 
-async def upload_pdf(file: UploadFile = File(...)):
-    """Handles PDF uploads and stores extracted text in FAISS."""
-    global stored_content
+async def upload_pdf(file: UploadFile = File(...), scope: str = SHARED_SCOPE):
+    """Saves a PDF upload and queues extraction into the scope's FAISS index as a background job."""
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Invalid file type.")
+    file_location = await spool_upload(file)
+    return submit_job("pdf", ingest_pdf_job, file_location, f"pdf:{os.path.basename(file.filename)}", scope,
+                      cleanup=partial(remove_upload, file_location))
+
+async def ingest_pdf_job(job, file_location, document_id, scope=SHARED_SCOPE):
+    """Extracts a saved PDF page by page and stores its chunks in FAISS, then deletes the spooled file."""
+    def on_progress(pages_done, total_pages):
+        job.raise_if_cancelled()
+        job.report(pages_done / total_pages, f"Processed page {pages_done}/{total_pages}")
+
+    def ingest():
+        with knowledge.checkout(scope) as store:
+            result = ingest_pdf(file_location, store, document_id, on_progress)
+            store.save()
+            return result
+
     try:
-        file_location = os.path.join(UPLOAD_DIRECTORY, file.filename)
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-        pdf_document = fitz.open(file_location)
-        pdf_text = "".join(page.get_text("text") for page in pdf_document)
-        stored_content = pdf_text
-        store_text_in_faiss(stored_content)
-        return JSONResponse(content={"message": "PDF uploaded!", "pdf_text": pdf_text})
-    except Exception as e:
-        print(f"Error uploading PDF: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
-    
-async def upload_excel(file: UploadFile = File(...)):
-    """Handles Excel uploads and stores student details in the database."""
+        result = await run_embedding_job(ingest)
+    finally:
+        remove_upload(file_location)  # A cancelled ingest fails at its next page and discards its chunks
+    stored_content[scope] = result.pop("preview")
+    job.report(1.0, "PDF uploaded!")
+    return result
+
+async def upload_excel(file: UploadFile = File(...), batch_size: int = EXCEL_IMPORT_BATCH_SIZE):
+    """Saves an Excel upload and queues the bulk student import as a background job."""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Invalid file type.")
+    file_location = await spool_upload(file)
+    return submit_job("excel", import_excel_job, file_location, batch_size, cleanup=partial(remove_upload, file_location))
+
+async def import_excel_job(job, file_location, batch_size):
+    """Bulk-inserts the students of a saved Excel file, reporting rows processed, then deletes the file."""
+    def on_progress(rows_read, total_rows):
+        job.raise_if_cancelled()
+        job.report(rows_read / total_rows if total_rows else None, f"{rows_read} row(s) processed")
+
     try:
-        file_location = os.path.join(UPLOAD_DIRECTORY, file.filename)
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-        df = pd.read_excel(file_location)
-        for index, row in df.iterrows():
-            student_data = {
-                "name": row["name"],
-                "student_class": row["student_class"],
-                "dob": row["dob"],
-                "gender": row["gender"],
-                "city": row["city"],
-                "marks": row["marks"]
-            }
-            add_student_to_db(student_data)
-        return JSONResponse(content={"message": "Student details added to the database successfully!"})
-    except Exception as e:
-        print(f"Error uploading Excel: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        report = await import_students_from_excel(file_location, batch_size, on_progress)
+    finally:
+        remove_upload(file_location)
+    job.report(message=f"{report['inserted']} student(s) added, {report['failed']} row(s) rejected.")
+    return report
+
+async def ingest_url_job(job, url, scope=SHARED_SCOPE):
+    """Background wrapper around fetch_and_parse_url."""
+    result = await fetch_and_parse_url(url, scope)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    job.report(message=result["message"])
+    return result
+
+async def ingest_transcript_job(job, video_id, scope=SHARED_SCOPE):
+    """Background wrapper around fetch_transcript."""
+    result = await fetch_transcript(video_id, scope)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    job.report(message=result["message"])
+    return result
+
+def queue_ingestion(kind, func, *args):
+    """Queues ingestion from the chat flow and describes the job handle."""
+    try:
+        job = job_manager.submit(kind, func, *args)
+    except JobQueueFull as e:
+        return {"error": str(e)}
+    return {"message": f"Processing in the background (job {job.id}).", "job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+async def warm_up_models():
+    """Background startup task: loads the models and embeds the FAQ questions."""
+    await warm_up(faq.load)
+
+async def match_faq(query: str):
+    """FAQ answer for the query: exact matches inline, fuzzy ones on the embedding executor."""
+    # Until the model is loaded even a lookup may embed (on FAQ reload), so keep it off the event loop
+    answer = faq.lookup(query) if embeddings.loaded else None
+    if answer is None:
+        answer = await run_embedding(faq.match, query)
+    return answer
+
+async def plan_agent_query(query: str, scope: str = SHARED_SCOPE):
+    """Decides how to answer a chatbot query: a ready reply or an LLMPrompt."""
+    # Handle URL queries
+    if "http" in query:
+        url = re.search(r"https?://[^\s]+", query).group().rstrip(".,!?")
+        if "youtube.com" in url or "youtu.be" in url:
+            video_id = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", url)
+            if video_id:
+                if await asyncio.to_thread(has_knowledge, scope, f"youtube:{video_id.group(1)}"):
+                    return json.dumps({"message": "Video transcript is already indexed."})
+                return json.dumps(queue_ingestion("youtube", ingest_transcript_job, video_id.group(1), scope))
+        return json.dumps(queue_ingestion("url", ingest_url_job, url, scope))
+
+    # Answer FAQ variants without the LLM
+    answer = await match_faq(query)
+    if answer is not None:
+        return answer
 
-def run_agent(query: str):
+    # Handle student queries
+    if "student" in query or "students" in query:
+        return LLMPrompt("context", query, await build_student_context(query))
+
+    # Handle summarization queries
+    if "summarize" in query:
+        return LLMPrompt("summarize", query, stored_content.get(scope, ""))
+
+    # Handle general queries
+    if not stored_content.get(scope) and not await asyncio.to_thread(has_knowledge, scope):
+        return LLMPrompt("general", query)
+
+    # Retrieve relevant context from FAISS
+    return LLMPrompt("context", query, await run_embedding(retrieve_relevant_info, query, scope))
+
+async def run_agent(query: str, scope: str = SHARED_SCOPE):
     """Handles user queries and generates responses."""
     query = query.strip().lower()
 
     try:
-        # Handle URL queries
-        if "http" in query:
-            url = re.search(r"https?://[^\s]+", query).group().rstrip(".,!?")
-            if "youtube.com" in url or "youtu.be" in url:
-                video_id = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", url)
-                if video_id:
-                    return json.dumps(fetch_transcript(video_id.group(1)))
-            return json.dumps(fetch_and_parse_url(url))
-
-        # Handle student queries
-        if "student" in query or "students" in query:
-            students = get_students()
-            student_data = "\n".join([f"{student['name']}: {student}" for student in students])
-            messages = [
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=f"Context: {student_data}\nQuery: {query}")
-            ]
-            response = llm.invoke(messages)
-            return response.content
-
-        # Handle summarization queries
-        if "summarize" in query:
-            messages = [
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=f"Context: {stored_content}\nQuery: Summarize the content in 20 words.")
-            ]
-            response = llm.invoke(messages)
-            return response.content
-
-        # Handle general queries
-        if not stored_content:
-            messages = [
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=f"Query: {query}")
-            ]
-            response = llm.invoke(messages)
-            return response.content
-
-        # Retrieve relevant context from FAISS
-        retrieved_context = retrieve_relevant_info(query)
-        messages = [
-            SystemMessage(content="You are a helpful assistant."),
-            HumanMessage(content=f"Context: {retrieved_context}\nQuery: {query}")
-        ]
-
-        response = llm.invoke(messages)
-        print(f"LLM Response: {response.content}")
-        return response.content
+        plan = await plan_agent_query(query, scope)
+        if not isinstance(plan, LLMPrompt):
+            return plan
+        response = await ask_llm(*plan)
+        print(f"LLM Response: {response}")
+        return response
 
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"Error processing query: {str(e)}")
         return json.dumps({"error": "An error occurred while processing the query."})
 
-async def ask_question(query: str):
+async def stream_agent(query: str, scope: str = SHARED_SCOPE):
+    """Streaming variant of run_agent: yields answer tokens as they are generated."""
+    plan = await plan_agent_query(query.strip().lower(), scope)
+    if isinstance(plan, LLMPrompt):
+        async for token in stream_llm(*plan):
+            yield token
+    else:
+        yield plan
+
+async def plan_question(query: str, scope: str = SHARED_SCOPE):
+    """Decides how to answer an /ask query: a ready response or an LLMPrompt."""
+    # Check if query matches FAQ
+    answer = await match_faq(query)
+    if answer is not None:
+        return answer
+
+    # Check if query is about a student
+    matches = student_names.find(query)
+    if matches:
+        student_data = await get_student_by_id(matches[0][1][0])
+        return student_data if student_data else "Student not found"
+
+    # Handle summarization queries
+    if "summarize" in query:
+        return LLMPrompt("summarize", query, stored_content.get(scope, ""))
+
+    # Handle general queries
+    if not stored_content.get(scope) and not await asyncio.to_thread(has_knowledge, scope):
+        return LLMPrompt("general", query)
+
+    # Retrieve relevant context from FAISS
+    return LLMPrompt("context", query, await run_embedding(retrieve_relevant_info, query, scope))
+
+async def ask_question(query: str, scope: str = SHARED_SCOPE):
     """Processes user queries and returns responses."""
     query = query.strip().lower()
 
     try:
-        # Check if query matches FAQ
-        if query in FAQ_DATA:
-            return JSONResponse(content={"response": FAQ_DATA[query]})
-
-        # Check if query is about a student
-        student_name = next((s["name"].strip().lower() for s in get_students() if s["name"].strip().lower() in query), None)
-        if student_name:
-            student_data = get_student_info(student_name)
-            return JSONResponse(content={"response": student_data if student_data else "Student not found"})
-
-        # Handle summarization queries
-        if "summarize" in query:
-            messages = [
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=f"Context: {stored_content}\nQuery: Summarize the content in 20 words.")
-            ]
-            response = llm.invoke(messages)
-            return JSONResponse(content={"response": response.content})
-
-        # Handle general queries
-        if not stored_content:
-            messages = [
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=f"Query: {query}")
-            ]
-            response = llm.invoke(messages)
-            return JSONResponse(content={"response": response.content})
-
-        # Retrieve relevant context from FAISS
-        retrieved_context = retrieve_relevant_info(query)
-        messages = [
-            SystemMessage(content="You are a helpful assistant."),
-            HumanMessage(content=f"Context: {retrieved_context}\nQuery: {query}")
-        ]
-
-        response = llm.invoke(messages)
-        print(f"LLM Response: {response.content}")
-        return JSONResponse(content={"response": response.content})
+        plan = await plan_question(query, scope)
+        if not isinstance(plan, LLMPrompt):
+            return JSONResponse(content={"response": plan})
+        response = await ask_llm(*plan)
+        print(f"LLM Response: {response}")
+        return JSONResponse(content={"response": response})
 
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"Error processing question: {str(e)}")
         return JSONResponse(status_code=500, content={"error": "An error occurred while processing the question."})
+
+async def stream_question(query: str, scope: str = SHARED_SCOPE):
+    """Streaming variant of ask_question: yields tokens, or one ready (possibly structured) response."""
+    plan = await plan_question(query.strip().lower(), scope)
+    if isinstance(plan, LLMPrompt):
+        async for token in stream_llm(*plan):
+            yield token
+    else:
+        yield plan
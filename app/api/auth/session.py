@@ -0,0 +1,9 @@
+from fastapi import Request, HTTPException
+
+
+# Dependency that returns the logged-in user from the session
+def get_current_user(request: Request):
+    user = request.session.get("user")
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return user
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+import time
+
+# ChatGroq reads GROQ_API_KEY from the environment when the model is first built
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Load both models in a background task at startup; otherwise the first AI request loads them
+AI_WARMUP = os.getenv("AI_WARMUP", "true").lower() == "true"
+
+_llm = None
+_embeddings = None
+_lock = threading.Lock()
+_state = {"status": "cold", "error": None, "load_seconds": None}
+
+
+def get_llm():
+    """The chat model, built on first use; langchain_groq is only imported then."""
+    global _llm
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                from langchain_groq import ChatGroq
+                _llm = ChatGroq(model_name=LLM_MODEL)
+    return _llm
+
+
+def get_embeddings():
+    """The cached sentence-transformers model, loaded on first use (pulls in torch)."""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                from app.api.core.embedding_cache import CachedEmbeddings
+                _embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL)
+    return _embeddings
+
+
+class LazyEmbeddings:
+    """Stand-in handed to stores and caches at import time; loads the real model when first asked to embed."""
+
+    @property
+    def loaded(self):
+        return _embeddings is not None
+
+    def embed_documents(self, texts):
+        return get_embeddings().embed_documents(texts)
+
+    def embed_query(self, text):
+        return get_embeddings().embed_query(text)
+
+    def stats(self):
+        if _embeddings is None:
+            return {"model": EMBEDDING_MODEL, "loaded": False}
+        return dict(_embeddings.stats(), loaded=True)
+
+
+embeddings = LazyEmbeddings()
+
+
+async def warm_up(*preloads):
+    """Loads both models off the event loop, then runs each preload callable (e.g. FAQ vectors)."""
+    started = time.monotonic()
+    _state.update(status="loading", error=None)
+    try:
+        await asyncio.to_thread(get_embeddings)
+        await asyncio.to_thread(get_llm)
+        for preload in preloads:
+            await asyncio.to_thread(preload)
+    except Exception as e:
+        print(f"Error loading AI models: {str(e)}")
+        _state.update(status="failed", error=str(e))
+        return
+    _state.update(status="ready", load_seconds=round(time.monotonic() - started, 2))
+
+
+def is_ready():
+    """Whether AI requests can be served without a cold model load."""
+    if _state["status"] == "ready" or (_llm is not None and _embeddings is not None):
+        return True
+    return not AI_WARMUP and _state["status"] != "failed"
+
+
+def readiness():
+    return dict(_state, llm_loaded=_llm is not None, embeddings_loaded=_embeddings is not None)
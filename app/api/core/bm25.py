@@ -0,0 +1,74 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+# Words plus joined codes such as "cs-101", "2024-05-01" or "12/05/2024"
+_TOKEN = re.compile(r"\w+(?:[-/.:]\w+)*")
+
+
+def tokenize(text):
+    """Lower-cased terms; joined codes also yield their parts so "CS-101" matches "cs 101"."""
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-/.:]", token) if part)
+    return terms
+
+
+class BM25Index:
+    """In-memory inverted index scored with Okapi BM25.
+
+    Postings map term -> {chunk id: term frequency}; it is kept in step
+    with the vector index on every add/remove and rebuilt from chunk
+    text on load, so it never needs its own files.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, chunk_id, text):
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
+        length = sum(terms.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+
+    def remove(self, chunk_id, text):
+        if chunk_id not in self._lengths:
+            return
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+
+    def search(self, query, k, allowed=None):
+        """Top-k (chunk id, score) pairs; `allowed` optionally restricts the candidate ids."""
+        if not self._lengths:
+            return []
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = frequency + self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
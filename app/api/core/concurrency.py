@@ -0,0 +1,91 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+EMBEDDING_MAX_QUEUE = int(os.getenv("EMBEDDING_MAX_QUEUE", "64"))
+# Threads for background ingestion (PDF, URL, transcript jobs), separate from interactive embedding
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+
+class Overloaded(Exception):
+    """Raised when a limiter's wait queue is full; mapped to an HTTP 429/503."""
+
+    def __init__(self, name, status_code, retry_after):
+        super().__init__(f"The {name} service is busy, please retry shortly.")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Caps concurrent work and rejects new callers once too many are already waiting."""
+
+    def __init__(self, name, max_concurrency, max_queue, status_code, retry_after=2):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    def check(self):
+        """Raises Overloaded if a new caller would be turned away right now."""
+        if self.in_flight >= self.max_concurrency and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.status_code, self.retry_after)
+
+    async def __aenter__(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.check()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+llm_limiter = AdmissionLimiter("LLM", LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, status_code=429)
+embedding_limiter = AdmissionLimiter("embedding", EMBEDDING_WORKERS, EMBEDDING_MAX_QUEUE, status_code=503)
+
+# CPU-bound embedding work gets its own threads so it never starves the default pool
+_embedding_executor = ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS, thread_name_prefix="embedding")
+# Ingestion jobs queue on their own threads, so uploads never take chat/search capacity
+_ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+
+
+async def run_embedding(func, *args, **kwargs):
+    """Runs a blocking embedding/search call on the embedding executor under admission control."""
+    async with embedding_limiter:
+        return await asyncio.get_running_loop().run_in_executor(_embedding_executor, partial(func, *args, **kwargs))
+
+
+async def run_embedding_job(func, *args, **kwargs):
+    """Runs blocking ingestion work (extraction, embedding, saving) on the ingest executor; callers wait, never rejected."""
+    return await asyncio.get_running_loop().run_in_executor(_ingest_executor, partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    _embedding_executor.shutdown(wait=False, cancel_futures=True)
+    _ingest_executor.shutdown(wait=False, cancel_futures=True)
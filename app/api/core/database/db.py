@@ -1,39 +1,457 @@
-from pymongo import MongoClient 
+from pymongo import AsyncMongoClient, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+import asyncio
 import os
+import unicodedata
+from datetime import date, datetime, time
 from bson import ObjectId
-from fastapi import FastAPI, Query
+from bson.errors import InvalidId
+from app.api.core.database.student_cache import StudentSnapshot
+from app.api.core.metrics import span
 
 
-# Initialize FastAPI instance
-app = FastAPI()
+# Connection settings (pool size and timeouts are tunable per deployment)
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+# Follow writes made by other processes through a change stream (needs a replica set)
+STUDENT_CHANGE_STREAMS = os.getenv("STUDENT_CHANGE_STREAMS", "true").lower() in ("1", "true", "yes")
+# Longest wait between change stream reconnect attempts
+STUDENT_WATCH_MAX_BACKOFF_SECONDS = float(os.getenv("STUDENT_WATCH_MAX_BACKOFF_SECONDS", "60"))
+# Without change streams, the snapshot is reloaded this often to bound staleness (0 disables)
+STUDENT_SNAPSHOT_TTL_SECONDS = float(os.getenv("STUDENT_SNAPSHOT_TTL_SECONDS", "60"))
+# "only supported on replica sets" (standalone servers) and "change stream history lost"
+_CHANGE_STREAMS_UNSUPPORTED = 40573
+_CHANGE_STREAM_HISTORY_LOST = 286
 
- 
+# Pooled async client, created on application startup
+client = None
+collection = None
+events_collection = None
 
 
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")  
-client = MongoClient(MONGO_URL)
-db = client["student_db"]
-collection = db["students"]
+async def connect_db():
+    """Creates the pooled async client and binds the collections."""
+    global client, collection, events_collection
+    if client is not None:
+        return
+    client = AsyncMongoClient(
+        MONGO_URL,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    )
+    await client.aconnect()
+    collection = client["student_db"]["students"]
 
-# Database & Collection
-db = client["student_management"]
-events_collection = db["events"]
+    # Database & Collection
+    events_collection = client["student_management"]["events"]
 
-def get_students():
-    students = list(collection.find({}))  # Fetch all students including `_id`
-    
-    # Convert `_id` from ObjectId to string
-    for student in students:
-        student["_id"] = str(student["_id"])
-    
+
+async def close_db():
+    """Closes the pooled client on application shutdown."""
+    global client, collection, events_collection
+    if client is not None:
+        await client.close()
+    client = collection = events_collection = None
+    student_snapshot.invalidate()
+
+
+# Callbacks notified after student writes: listener(event, student_id, document)
+_student_listeners = []
+
+
+def add_student_listener(listener):
+    if listener not in _student_listeners:
+        _student_listeners.append(listener)
+
+
+def _notify_students(event, student_id, document=None):
+    for listener in _student_listeners:
+        try:
+            listener(event, student_id, document)
+        except Exception as e:
+            print(f"Error in student listener: {str(e)}")
+
+
+def name_key(name):
+    """Case- and accent-folded name used for indexed prefix search and sorting."""
+    folded = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(folded.lower().split())
+
+
+def _with_name_key(student_data):
+    if "name" in student_data:
+        student_data["name_key"] = name_key(student_data["name"])
+    return student_data
+
+
+async def backfill_name_keys(batch_size=1000):
+    """Adds name_key to students written before it existed; returns how many were updated."""
+    updated = 0
+    while True:
+        cursor = collection.find({"name_key": {"$exists": False}, "name": {"$type": "string"}}, {"name": 1}).limit(batch_size)
+        students = await cursor.to_list(None)
+        if not students:
+            return updated
+        result = await collection.bulk_write(
+            [UpdateOne({"_id": student["_id"]}, {"$set": {"name_key": name_key(student["name"])}}) for student in students],
+            ordered=False,
+        )
+        updated += result.modified_count
+        if len(students) < batch_size:
+            return updated
+
+
+def _serialize(document):
+    document["_id"] = str(document["_id"])  # Convert ObjectId to string
+    return document
+
+
+async def _fetch_students():
+    students = await collection.find({}).to_list(None)  # Fetch all students including `_id`
+    return [_serialize(student) for student in students]
+
+
+# In-process copy of the students collection, patched by the write helpers below
+student_snapshot = StudentSnapshot(_fetch_students)
+add_student_listener(student_snapshot.apply)
+
+
+async def get_students():
+    """All students, served from the in-process snapshot after the first load."""
+    with span("db.get_students"):
+        return await student_snapshot.get_students()
+
+
+def get_students_version():
+    """Increases on every student write; lets callers detect stale derived data."""
+    return student_snapshot.version
+
+
+def _apply_student_change(change):
+    operation = change["operationType"]
+    if operation in ("insert", "replace", "update"):
+        document = change.get("fullDocument")
+        if document is None:
+            return  # Deleted again before the lookup ran
+        event = "insert" if operation == "insert" else "update"
+        _notify_students(event, str(document["_id"]), _serialize(document))
+    elif operation == "delete":
+        _notify_students("delete", str(change["documentKey"]["_id"]))
+    else:
+        _notify_students("reset", None)  # drop / rename / invalidate
+
+
+async def _expire_students_periodically():
+    """Fallback without change streams: resets the snapshot and name index every TTL."""
+    if STUDENT_SNAPSHOT_TTL_SECONDS <= 0:
+        return
+    while True:
+        await asyncio.sleep(STUDENT_SNAPSHOT_TTL_SECONDS)
+        _notify_students("reset", None)
+
+
+async def watch_student_changes():
+    """Replays writes from other processes into the listeners via a change stream.
+
+    On an error the listeners are reset (writes may have been missed) and
+    the stream is reopened from the last resume token with exponential
+    backoff. Standalone servers do not support change streams, and the
+    stream can be turned off with STUDENT_CHANGE_STREAMS; the snapshot is
+    then reloaded every STUDENT_SNAPSHOT_TTL_SECONDS instead.
+    """
+    if not STUDENT_CHANGE_STREAMS:
+        return await _expire_students_periodically()
+    resume_token = None
+    delay = 1.0
+    while True:
+        try:
+            async with await collection.watch(full_document="updateLookup", resume_after=resume_token) as stream:
+                delay = 1.0
+                async for change in stream:
+                    _apply_student_change(change)
+                    resume_token = None if change["operationType"] == "invalidate" else stream.resume_token
+        except OperationFailure as e:
+            if e.code == _CHANGE_STREAMS_UNSUPPORTED:
+                print(f"Student change stream unavailable, reloading every {STUDENT_SNAPSHOT_TTL_SECONDS}s: {str(e)}")
+                return await _expire_students_periodically()
+            if e.code == _CHANGE_STREAM_HISTORY_LOST:
+                resume_token = None  # The oplog moved past the token; start from now
+            print(f"Student change stream failed, retrying in {delay}s: {str(e)}")
+        except PyMongoError as e:
+            print(f"Student change stream failed, retrying in {delay}s: {str(e)}")
+        _notify_students("reset", None)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STUDENT_WATCH_MAX_BACKOFF_SECONDS)
+
+
+async def get_student_fields(*fields, include_id=False):
+    """Fetches only the given fields of every student."""
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 1 if include_id else 0
+    students = await collection.find({}, projection).to_list(None)
+    if include_id:
+        students = [_serialize(student) for student in students]
     return students
 
 
-async def get_events():
-    events = list(events_collection.find({}))  # Fetch all events
-    for event in events:
-        event["_id"] = str(event["_id"])  # Convert ObjectId to string
-    return events
+async def get_student_by_id(student_id):
+    if student_snapshot.loaded:
+        return await student_snapshot.get(student_id)
+    student = await collection.find_one({"_id": ObjectId(student_id)})
+    return _serialize(student) if student else None
+
+
+async def add_student_to_db(student_data):
+    _with_name_key(student_data)
+    result = await collection.insert_one(student_data)
+    _notify_students("insert", str(result.inserted_id), student_data)
+    return str(result.inserted_id)
+
+
+async def insert_students(students):
+    """Inserts a batch with one unordered bulk write.
+
+    Returns the number inserted and a list of (batch index, error message)
+    for the documents the server rejected.
+    """
+    if not students:
+        return 0, []
+    for student in students:
+        _with_name_key(student)
+    try:
+        await collection.insert_many(students, ordered=False)
+        errors = []
+    except BulkWriteError as e:
+        errors = [(error["index"], error.get("errmsg", "write failed")) for error in e.details.get("writeErrors", [])]
+    failed = {index for index, _ in errors}
+    inserted = [student for index, student in enumerate(students) if index not in failed]
+    for student in inserted:
+        _notify_students("insert", str(student["_id"]), student)
+    return len(inserted), errors
+
+
+async def update_student_in_db(student_id, student_data):
+    """Returns False when no student matches the given id."""
+    _with_name_key(student_data)
+    result = await collection.update_one({"_id": ObjectId(student_id)}, {"$set": student_data})
+    if result.matched_count:
+        _notify_students("update", student_id, student_data)
+    return result.matched_count > 0
+
+
+async def delete_student_from_db(student_id):
+    """Returns False when no student matches the given id."""
+    result = await collection.delete_one({"_id": ObjectId(student_id)})
+    if result.deleted_count:
+        _notify_students("delete", student_id)
+    return result.deleted_count > 0
+
+
+def _object_ids(student_ids):
+    """Splits ids into {ObjectId: id as given} and the ids that are not valid ObjectIds."""
+    valid, invalid = {}, []
+    for student_id in student_ids:
+        try:
+            valid[ObjectId(student_id)] = student_id
+        except (InvalidId, TypeError):
+            invalid.append(student_id)
+    return valid, invalid
+
+
+async def _resolve_ids(student_ids=None, query_filter=None):
+    """Returns (matching ObjectIds, per-id results for ids that matched nothing)."""
+    if student_ids is None:
+        return [student["_id"] async for student in collection.find(query_filter, {"_id": 1})], []
+    valid, invalid = _object_ids(student_ids)
+    found = [student["_id"] async for student in collection.find({"_id": {"$in": list(valid)}}, {"_id": 1})]
+    found_set = set(found)
+    unmatched = [{"id": student_id, "status": "not_found"} for oid, student_id in valid.items() if oid not in found_set]
+    unmatched += [{"id": student_id, "status": "invalid_id"} for student_id in invalid]
+    return found, unmatched
+
+
+async def delete_students(student_ids=None, query_filter=None):
+    """Deletes students by id list or filter with a single delete_many."""
+    found, unmatched = await _resolve_ids(student_ids, query_filter)
+    if found:
+        await collection.delete_many({"_id": {"$in": found}})
+    for oid in found:
+        _notify_students("delete", str(oid))
+    return {"deleted": len(found), "results": [{"id": str(oid), "status": "deleted"} for oid in found] + unmatched}
+
+
+# Fields of the unique (name_key, dob) natural key; several students can never share one value of both
+NATURAL_KEY_FIELDS = ("name", "dob")
+
+
+async def update_students(changes, student_ids=None, query_filter=None):
+    """Applies the same $set to students selected by id list or filter with a single update_many.
+
+    Raises ValueError when the changes set a natural-key field on more than
+    one student, since every write after the first would be a duplicate.
+    """
+    _with_name_key(changes)
+    found, unmatched = await _resolve_ids(student_ids, query_filter)
+    if len(found) > 1 and any(field in changes for field in NATURAL_KEY_FIELDS):
+        raise ValueError("'name' and 'dob' can only be changed for one student at a time")
+    if found:
+        try:
+            await collection.update_many({"_id": {"$in": found}}, {"$set": changes})
+        except PyMongoError:
+            _notify_students("reset", None)  # Some students may already be updated
+            raise
+    for oid in found:
+        _notify_students("update", str(oid), dict(changes))
+    return {"updated": len(found), "results": [{"id": str(oid), "status": "updated"} for oid in found] + unmatched}
+
+
+async def update_student_groups(groups):
+    """Runs several (filter, $set) updates as one ordered bulk write.
+
+    Every group's students are resolved before anything is written, so a
+    change made by one group (e.g. class 9 -> 10) is never picked up by a
+    later group (class 10 -> 11). Returns the number updated per group.
+    """
+    resolved = [(await _resolve_ids(query_filter=query_filter))[0] for query_filter, _ in groups]
+    requests = [
+        UpdateMany({"_id": {"$in": found}}, {"$set": _with_name_key(changes)})
+        for found, (_, changes) in zip(resolved, groups) if found
+    ]
+    if requests:
+        try:
+            await collection.bulk_write(requests, ordered=True)
+        except PyMongoError:
+            _notify_students("reset", None)  # Earlier groups may already be written
+            raise
+    for found, (_, changes) in zip(resolved, groups):
+        for oid in found:
+            _notify_students("update", str(oid), dict(changes))
+    return [len(found) for found in resolved]
+
+
+async def upsert_students(students):
+    """Inserts or updates students keyed by (folded name, dob) in one unordered bulk write.
+
+    Returns a result per input item: inserted, updated, superseded (a later
+    item in the same batch has the same key) or error.
+    """
+    results = [None] * len(students)
+    latest = {}
+    for index, student in enumerate(students):
+        _with_name_key(student)
+        key = (student.get("name_key"), student.get("dob"))
+        if key in latest:
+            results[latest[key]] = {"index": latest[key], "status": "superseded"}
+        latest[key] = index
+    indexes = sorted(latest.values())
+    if not indexes:
+        return results
+
+    requests = [
+        UpdateOne({"name_key": students[i]["name_key"], "dob": students[i].get("dob")}, {"$set": students[i]}, upsert=True)
+        for i in indexes
+    ]
+    upserted, errors = {}, {}
+    pending = list(range(len(requests)))
+    for attempt in range(2):
+        batch, pending = pending, []
+        try:
+            result = await collection.bulk_write([requests[position] for position in batch], ordered=False)
+            upserted.update({batch[index]: _id for index, _id in result.upserted_ids.items()})
+        except BulkWriteError as e:
+            upserted.update({batch[item["index"]]: item["_id"] for item in e.details.get("upserted", [])})
+            for error in e.details.get("writeErrors", []):
+                position = batch[error["index"]]
+                if error.get("code") == 11000 and attempt == 0:
+                    pending.append(position)  # Lost an insert race on the unique key; the retry updates the winner
+                else:
+                    errors[position] = error.get("errmsg", "write failed")
+        if not pending:
+            break
+
+    # Matched (not upserted) documents do not report their ids; look them up by key
+    matched = [i for position, i in enumerate(indexes) if position not in upserted and position not in errors]
+    ids = {}
+    if matched:
+        keys = [{"name_key": students[i]["name_key"], "dob": students[i].get("dob")} for i in matched]
+        async for student in collection.find({"$or": keys}, {"name_key": 1, "dob": 1}):
+            ids[(student["name_key"], student.get("dob"))] = student["_id"]
+
+    for position, i in enumerate(indexes):
+        if position in errors:
+            results[i] = {"index": i, "status": "error", "error": errors[position]}
+            continue
+        if position in upserted:
+            student_id, event = str(upserted[position]), "insert"
+        else:
+            student_id, event = str(ids.get((students[i]["name_key"], students[i].get("dob")), "")), "update"
+        results[i] = {"index": i, "id": student_id, "status": "inserted" if event == "insert" else "updated"}
+        if student_id:
+            _notify_students(event, student_id, students[i])
+    return results
+
+
+def _to_datetime(value):
+    """BSON has no date type, so event dates are stored as midnight datetimes."""
+    return datetime.combine(value, time.min) if not isinstance(value, datetime) else value
+
+
+def _serialize_event(event):
+    _serialize(event)
+    event["id"] = event["_id"]
+    if isinstance(event.get("date"), datetime):
+        event["date"] = event["date"].date().isoformat()
+    return event
+
+
+async def get_events(start=None, end=None, limit=None):
+    """Events in date order, optionally limited to [start, end]; uses the date index."""
+    query = {}
+    if start is not None:
+        query["$gte"] = _to_datetime(start)
+    if end is not None:
+        query["$lte"] = _to_datetime(end)
+    cursor = events_collection.find({"date": query} if query else {}).sort("date", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [_serialize_event(event) for event in await cursor.to_list(None)]
+
+
+async def add_event_to_db(event_data):
+    if isinstance(event_data.get("date"), date):
+        event_data["date"] = _to_datetime(event_data["date"])
+    result = await events_collection.insert_one(event_data)
+    return str(result.inserted_id)
+
+
+async def delete_event_from_db(event_id):
+    """Returns False when no event matches the given id."""
+    result = await events_collection.delete_one({"_id": ObjectId(event_id)})
+    return result.deleted_count > 0
+
 
-def add_student_to_db(student_data):
-    collection.insert_one(student_data)
\ No newline at end of file
+async def migrate_event_dates():
+    """Converts legacy "YYYY-MM-DD" string dates to datetimes; returns how many changed."""
+    updates = []
+    async for event in events_collection.find({"date": {"$type": "string"}}, {"date": 1}):
+        try:
+            value = date.fromisoformat(event["date"].strip())
+        except ValueError:
+            print(f"Skipping event {event['_id']} with unparseable date {event['date']!r}")
+            continue
+        updates.append(UpdateOne({"_id": event["_id"]}, {"$set": {"date": _to_datetime(value)}}))
+    if not updates:
+        return 0
+    result = await events_collection.bulk_write(updates, ordered=False)
+    return result.modified_count
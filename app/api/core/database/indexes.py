@@ -0,0 +1,125 @@
+import os
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.api.core.database import db
+
+# Create declared indexes on startup; turn off where a DBA manages them
+MONGO_AUTO_INDEX = os.getenv("MONGO_AUTO_INDEX", "true").lower() in ("1", "true", "yes")
+
+# Indexes every query path relies on, per collection attribute in db.py
+REQUIRED_INDEXES = {
+    "collection": [
+        # Folded name: prefix search, name sort and natural-key lookups
+        IndexModel([("name_key", ASCENDING), ("_id", ASCENDING)], name="name_key_1__id_1"),
+        # Natural key used by the bulk upsert; unique so concurrent upserts cannot both insert
+        IndexModel(
+            [("name_key", ASCENDING), ("dob", ASCENDING)],
+            name="name_key_1_dob_1",
+            unique=True,
+            partialFilterExpression={"name_key": {"$type": "string"}, "dob": {"$type": "string"}},
+        ),
+        # Keyset sorts for the listing (field, then _id as tie-breaker)
+        IndexModel([("marks", ASCENDING), ("_id", ASCENDING)], name="marks_1__id_1"),
+        IndexModel([("dob", ASCENDING), ("_id", ASCENDING)], name="dob_1__id_1"),
+        IndexModel([("city", ASCENDING), ("_id", ASCENDING)], name="city_1__id_1"),
+        # Class/gender filters and the chart aggregations
+        IndexModel([("student_class", ASCENDING), ("gender", ASCENDING)], name="student_class_1_gender_1"),
+        IndexModel([("gender", ASCENDING)], name="gender_1"),
+    ],
+    "events_collection": [
+        IndexModel([("date", ASCENDING)], name="date_1"),
+    ],
+}
+
+
+def _collection(attribute):
+    return getattr(db, attribute)
+
+
+# Server codes for an existing index with the same name or keys but other options
+_INDEX_CONFLICTS = (85, 86)
+
+
+def _key(index):
+    return tuple(dict(index["key"]).items())
+
+
+async def _duplicates(collection, model, limit=20):
+    """Groups of documents sharing the key of a unique index (within its partial filter)."""
+    fields = [field for field, _ in _key(model.document)]
+    cursor = await collection.aggregate([
+        {"$match": model.document.get("partialFilterExpression", {})},
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ], allowDiskUse=True)
+    return [{"key": row["_id"], "count": row["count"], "ids": [str(_id) for _id in row["ids"][:10]]} async for row in cursor]
+
+
+async def _create_index(collection, model):
+    """Creates one index; a non-unique index on the same keys is replaced once no duplicates remain."""
+    try:
+        return await collection.create_indexes([model])
+    except OperationFailure as e:
+        if e.code not in _INDEX_CONFLICTS or not model.document.get("unique") or await _duplicates(collection, model, limit=1):
+            raise
+    async for index in await collection.list_indexes():
+        if _key(index) == _key(model.document) or index["name"] == model.document["name"]:
+            await collection.drop_index(index["name"])
+    return await collection.create_indexes([model])
+
+
+async def ensure_indexes():
+    """Creates any declared index that is missing; each index is created on its own so one failure does not block the rest."""
+    created = {}
+    for attribute, models in REQUIRED_INDEXES.items():
+        collection = _collection(attribute)
+        created[collection.name] = []
+        for model in models:
+            try:
+                created[collection.name] += await _create_index(collection, model)
+            except OperationFailure as e:
+                # Duplicate keys block a unique index; GET /admin/indexes lists them
+                print(f"Error creating index {model.document['name']} on {collection.name}: {str(e)}")
+    return created
+
+
+async def _index_usage(collection):
+    try:
+        cursor = await collection.aggregate([{"$indexStats": {}}])
+        return {row["name"]: row["accesses"] for row in await cursor.to_list(None)}
+    except OperationFailure:
+        return {}  # $indexStats needs the clusterMonitor role
+
+
+async def index_report():
+    """Declared vs existing indexes per collection, with usage counters since the last restart."""
+    report = {}
+    for attribute, models in REQUIRED_INDEXES.items():
+        collection = _collection(attribute)
+        indexes = [index async for index in await collection.list_indexes()]
+        existing = {index["name"]: dict(index["key"]) for index in indexes}
+        declared = {model.document["name"]: dict(model.document["key"]) for model in models}
+        existing_keys = {tuple(key.items()) for key in existing.values()}
+        declared_keys = {tuple(key.items()) for key in declared.values()}
+        unique_keys = {_key(index) for index in indexes if index.get("unique")}
+        # Unique indexes that do not exist as unique yet, and the duplicates that would block them
+        not_unique = [model for model in models if model.document.get("unique") and _key(model.document) not in unique_keys]
+        usage = await _index_usage(collection)
+        report[collection.name] = {
+            "missing": [name for name, key in declared.items() if tuple(key.items()) not in existing_keys],
+            "not_unique": [model.document["name"] for model in not_unique if _key(model.document) in existing_keys],
+            "duplicates": {model.document["name"]: await _duplicates(collection, model) for model in not_unique},
+            "undeclared": [name for name, key in existing.items() if name != "_id_" and tuple(key.items()) not in declared_keys],
+            "unused": [name for name, accesses in usage.items() if name != "_id_" and accesses["ops"] == 0],
+            "indexes": [
+                {
+                    "name": name,
+                    "key": key,
+                    "ops": usage[name]["ops"] if name in usage else None,
+                    "since": usage[name]["since"].isoformat() if name in usage else None,
+                }
+                for name, key in existing.items()
+            ],
+        }
+    return report
@@ -0,0 +1,101 @@
+import base64
+import re
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from app.api.core.database import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Public sort names -> stored fields; each has a (field, _id) index in indexes.py
+SORT_FIELDS = {"name": "name_key", "marks": "marks", "dob": "dob", "city": "city"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _regex_prefix(text):
+    # Escape only metacharacters; re.escape() also escapes spaces, which shortens the index bounds
+    return "^" + re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", text)
+
+
+def _variants(value):
+    """Exact-match spellings for case-insensitive equality that can still use an index."""
+    value = value.strip()
+    return list(dict.fromkeys([value, value.lower(), value.title(), value.upper()]))
+
+
+def build_student_filter(student_class=None, gender=None, city=None, min_marks=None, max_marks=None, name=None):
+    """MongoDB filter for the listing, export and bulk endpoints."""
+    conditions = []
+    if student_class:
+        values = _variants(student_class)
+        if student_class.strip().isdigit():
+            values.append(int(student_class))
+        conditions.append({"student_class": {"$in": values}})
+    if gender:
+        conditions.append({"gender": {"$in": _variants(gender)}})
+    if city:
+        conditions.append({"city": {"$in": _variants(city)}})
+    marks = {}
+    if min_marks is not None:
+        marks["$gte"] = min_marks
+    if max_marks is not None:
+        marks["$lte"] = max_marks
+    if marks:
+        conditions.append({"marks": marks})
+    if name and db.name_key(name):
+        # Anchored, case-sensitive prefix on the folded key is an index range scan
+        conditions.append({"name_key": {"$regex": _regex_prefix(db.name_key(name))}})
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def encode_cursor(student, field):
+    payload = json_util.dumps({"v": student.get(field), "id": ObjectId(student["_id"])})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return payload["v"], ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidCursor("Invalid page cursor")
+
+
+def _after(field, value, last_id, direction):
+    """Keyset condition for rows that sort after (value, last_id)."""
+    beyond = "$gt" if direction == ASCENDING else "$lt"
+    if value is None:
+        # Missing values sort first ascending and last descending
+        same = {field: None, "_id": {beyond: last_id}}
+        return {"$or": [same, {field: {"$ne": None}}]} if direction == ASCENDING else same
+    conditions = [{field: {beyond: value}}, {field: value, "_id": {beyond: last_id}}]
+    if direction == DESCENDING:
+        conditions.append({field: None})
+    return {"$or": conditions}
+
+
+async def list_students(query_filter=None, sort="name", descending=False, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """One keyset page of students; returns {"students", "next_cursor"}."""
+    field = SORT_FIELDS.get(sort)
+    if field is None:
+        raise ValueError(f"Cannot sort by {sort!r}; choose one of {', '.join(SORT_FIELDS)}")
+    direction = DESCENDING if descending else ASCENDING
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    conditions = [query_filter] if query_filter else []
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        conditions.append(_after(field, value, last_id, direction))
+    match = {} if not conditions else conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    # Fetch one extra row to know whether another page exists
+    rows = await db.collection.find(match).sort([(field, direction), ("_id", direction)]).limit(limit + 1).to_list(None)
+    students = [db._serialize(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(students[-1], field) if len(rows) > limit else None
+    return {"students": students, "next_cursor": next_cursor}
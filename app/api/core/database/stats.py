@@ -0,0 +1,80 @@
+from pymongo.errors import OperationFailure
+from app.api.core.database import db
+
+
+# Only numeric marks take part in histograms and averages
+NUMERIC_MARKS = {"marks": {"$type": "number"}}
+
+
+async def _aggregate(pipeline):
+    cursor = await db.collection.aggregate(pipeline)
+    return await cursor.to_list(None)
+
+
+async def count_by_gender():
+    """Counts students per lower-cased gender."""
+    rows = await _aggregate([
+        {"$group": {"_id": {"$toLower": {"$ifNull": ["$gender", "unknown"]}}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ])
+    counts = {row["_id"]: row["count"] for row in rows}
+    return {"total": sum(counts.values()), "counts": counts}
+
+
+async def count_by_class():
+    """Counts students per class, ordered by class name."""
+    rows = await _aggregate([
+        {"$group": {"_id": {"$toString": {"$ifNull": ["$student_class", "Unknown"]}}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}},
+    ])
+    return [{"student_class": row["_id"], "count": row["count"]} for row in rows]
+
+
+async def marks_histogram(bucket_width):
+    """Groups marks into buckets of `bucket_width`; each bucket covers [min, max)."""
+    rows = await _aggregate([
+        {"$match": NUMERIC_MARKS},
+        {"$group": {
+            "_id": {"$multiply": [{"$floor": {"$divide": ["$marks", bucket_width]}}, bucket_width]},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+    ])
+    return [{"min": row["_id"], "max": row["_id"] + bucket_width, "count": row["count"]} for row in rows]
+
+
+async def class_marks_summary(percentiles=(0.25, 0.5, 0.75, 0.9)):
+    """Average, min, max and percentiles of marks for each class.
+
+    Percentiles need MongoDB 7.0+; older servers get the summary without them.
+    """
+    group = {
+        "_id": {"$toString": {"$ifNull": ["$student_class", "Unknown"]}},
+        "count": {"$sum": 1},
+        "average": {"$avg": "$marks"},
+        "min": {"$min": "$marks"},
+        "max": {"$max": "$marks"},
+    }
+    pipeline = [{"$match": NUMERIC_MARKS}, {"$group": group}, {"$sort": {"_id": 1}}]
+    if percentiles:
+        group["percentiles"] = {"$percentile": {"input": "$marks", "p": list(percentiles), "method": "approximate"}}
+    try:
+        rows = await _aggregate(pipeline)
+    except OperationFailure:
+        if not percentiles:
+            raise
+        del group["percentiles"]
+        rows = await _aggregate(pipeline)
+
+    summary = []
+    for row in rows:
+        values = row.get("percentiles")
+        summary.append({
+            "student_class": row["_id"],
+            "count": row["count"],
+            "average": round(row["average"], 2),
+            "min": row["min"],
+            "max": row["max"],
+            "percentiles": {str(p): v for p, v in zip(percentiles, values)} if values else None,
+        })
+    return summary
@@ -0,0 +1,120 @@
+import asyncio
+
+# Fields kept as columns; anything else a document carries is kept per row in `extras`
+STUDENT_FIELDS = ("name", "name_key", "student_id", "student_class", "dob", "gender", "city", "marks")
+
+
+class StudentSnapshot:
+    """Read-through, columnar in-process copy of the students collection.
+
+    Rows are stored column by column (one list per field) with an id ->
+    row position map, which keeps thousands of students compact and lets
+    writes patch single rows. `version` increases on every change so
+    callers can tell whether data they derived is stale.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._load_lock = asyncio.Lock()
+        self.version = 0
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._ids = []
+        self._positions = {}
+        self._columns = {field: [] for field in STUDENT_FIELDS}
+        self._extras = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _split(self, document):
+        extras = {key: value for key, value in document.items() if key not in STUDENT_FIELDS and key != "_id"}
+        return extras or None
+
+    def _append(self, student_id, document):
+        self._positions[student_id] = len(self._ids)
+        self._ids.append(student_id)
+        for field in STUDENT_FIELDS:
+            self._columns[field].append(document.get(field))
+        self._extras.append(self._split(document))
+
+    def _row(self, position):
+        student = {"_id": self._ids[position]}
+        for field in STUDENT_FIELDS:
+            value = self._columns[field][position]
+            if value is not None:
+                student[field] = value
+        if self._extras[position]:
+            student.update(self._extras[position])
+        return student
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            version = self.version
+            students = await self._loader()
+            if version != self.version:
+                return  # A write landed mid-load; the next reader reloads
+            self._reset()
+            for student in students:
+                self._append(str(student["_id"]), student)
+            self.loaded = True
+
+    async def get_students(self):
+        await self.ensure_loaded()
+        if not self.loaded:
+            return await self._loader()
+        return [self._row(position) for position in range(len(self._ids))]
+
+    async def get(self, student_id):
+        await self.ensure_loaded()
+        position = self._positions.get(student_id)
+        return self._row(position) if position is not None else None
+
+    def invalidate(self):
+        self.loaded = False
+        self.version += 1
+        self._reset()
+
+    def apply(self, event, student_id, document=None):
+        """Patches the snapshot after a write (listener callback and change streams)."""
+        self.version += 1
+        if not self.loaded:
+            return
+        if event == "reset":
+            self.invalidate()
+            return
+        position = self._positions.get(student_id)
+        if event == "delete":
+            if position is None:
+                return
+            # Move the last row into the hole so deletes stay O(1)
+            last = len(self._ids) - 1
+            if position != last:
+                moved = self._ids[last]
+                self._ids[position] = moved
+                self._positions[moved] = position
+                for column in self._columns.values():
+                    column[position] = column[last]
+                self._extras[position] = self._extras[last]
+            self._ids.pop()
+            for column in self._columns.values():
+                column.pop()
+            self._extras.pop()
+            del self._positions[student_id]
+        elif position is None:
+            if document is None:
+                self.invalidate()
+            else:
+                self._append(student_id, document)
+        elif document is not None:
+            for field, value in document.items():
+                if field in self._columns:
+                    self._columns[field][position] = value
+                elif field != "_id":
+                    self._extras[position] = dict(self._extras[position] or {}, **{field: value})
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.api.core.metrics import span
+
+EMBEDDING_CACHE_DIRECTORY = os.getenv("EMBEDDING_CACHE_DIRECTORY", "embedding_cache")
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+
+
+def normalize_text(text):
+    """Unicode-normalizes and collapses whitespace so trivially different copies share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed cache in front of another Embeddings model.
+
+    Vectors are keyed by sha256(model name, normalized text) and kept in an
+    in-memory LRU backed by a SQLite file, so re-ingesting the same circular
+    or repeating a chat query never re-runs the model.
+    """
+
+    def __init__(self, embeddings, model_name, directory=EMBEDDING_CACHE_DIRECTORY, memory_size=EMBEDDING_CACHE_MEMORY_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "embeddings.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        """Returns {key: vector} for keys found in memory or on disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+            missing = [key for key in keys if key not in found]
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype="float32").tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+        return found
+
+    def _store(self, items):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype="float32").tobytes()) for key, vector in items],
+            )
+            self._db.commit()
+            for key, vector in items:
+                self._remember(key, vector)
+
+    def embed_documents(self, texts):
+        normalized = [normalize_text(text) for text in texts]
+        keys = [self._key(text) for text in normalized]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed each distinct missing text once
+        missing = {key: text for key, text in zip(keys, normalized) if key not in found}
+        if missing:
+            with span("embedding.documents"):
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+            items = list(zip(missing.keys(), vectors))
+            self._store(items)
+            found.update(items)
+            with self._lock:
+                self.misses += len(missing)
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text):
+        normalized = normalize_text(text)
+        key = self._key(normalized)
+        found = self._lookup([key])
+        if key not in found:
+            with span("embedding.query"):
+                vector = self.embeddings.embed_query(normalized)
+            self._store([(key, vector)])
+            with self._lock:
+                self.misses += 1
+            return list(vector)
+        return list(found[key])
+
+    def stats(self):
+        with self._lock:
+            (disk_entries,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {
+                "model": self.model_name,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+
+FAQ_PATH = os.getenv("FAQ_PATH", "faq.json")
+# Combined similarity (0-1) a query needs before an FAQ answer is used instead of the LLM
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.82"))
+FAQ_RELOAD_CHECK_SECONDS = 2.0
+EMBEDDING_WEIGHT = 0.6
+
+_CONTRACTIONS = (
+    (re.compile(r"\bwon't\b"), "will not"),
+    (re.compile(r"\bcan't\b"), "can not"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"\b(what|who|when|where|how|why|which|that|there|it|he|she)'s\b"), r"\1 is"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'ll\b"), " will"),
+    (re.compile(r"'ve\b"), " have"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"'d\b"), " would"),
+)
+_STOPWORDS = {"the", "a", "an", "is", "are", "of", "for", "to", "in", "on", "at", "please", "tell", "me", "can", "you", "i", "do", "does"}
+
+
+def normalize_question(text):
+    """Lower-cases, expands contractions and strips punctuation."""
+    text = text.lower().replace("’", "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def _terms(normalized):
+    return {token for token in normalized.split() if token not in _STOPWORDS}
+
+
+def _numbers(normalized):
+    return {token for token in normalized.split() if token.isdigit()}
+
+
+class FAQEngine:
+    """Answers FAQ variants without the LLM.
+
+    Questions are normalized and embedded once per load; a query scores
+    each question by cosine similarity blended with token overlap, and
+    numbers must agree exactly ("class 10" never answers "class 9").
+    faq.json is re-read whenever its modification time changes.
+    """
+
+    def __init__(self, path=FAQ_PATH, embeddings=None, threshold=FAQ_MATCH_THRESHOLD):
+        self.path = path
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._answers = {}      # normalized question -> answer
+        self._questions = []
+        self._vectors = None
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < FAQ_RELOAD_CHECK_SECONDS and self._mtime is not None:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading FAQ file: {str(e)}")  # Keep serving the previous version
+            return
+        answers = {normalize_question(question): answer for question, answer in data.items()}
+        questions = list(answers)
+        vectors = None
+        if self.embeddings is not None and questions:
+            vectors = np.asarray(self.embeddings.embed_documents(questions), dtype="float32")
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            self._answers, self._questions, self._vectors, self._mtime = answers, questions, vectors, mtime
+
+    def load(self):
+        """Reads and embeds faq.json now instead of on the first query (used by the warm-up task)."""
+        self._reload_if_changed()
+
+    def lookup(self, query):
+        """Exact match on the normalized question; cheap enough for the event loop."""
+        self._reload_if_changed()
+        answer = self._answers.get(normalize_question(query))
+        if answer is not None:
+            self.exact_hits += 1
+        return answer
+
+    def match(self, query):
+        """Best FAQ answer for the query, or None below the threshold. Embeds the query."""
+        self._reload_if_changed()
+        normalized = normalize_question(query)
+        with self._lock:
+            answers, questions, vectors = self._answers, self._questions, self._vectors
+        if normalized in answers:
+            self.exact_hits += 1
+            return answers[normalized]
+        if not questions or not normalized:
+            self.misses += 1
+            return None
+
+        terms, numbers = _terms(normalized), _numbers(normalized)
+        overlap = np.asarray([
+            len(terms & _terms(question)) / max(len(terms | _terms(question)), 1) for question in questions
+        ], dtype="float32")
+        scores = overlap
+        if vectors is not None:
+            vector = np.asarray(self.embeddings.embed_query(normalized), dtype="float32")
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            scores = EMBEDDING_WEIGHT * (vectors @ vector) + (1 - EMBEDDING_WEIGHT) * overlap
+        for position in np.argsort(-scores):
+            if scores[position] < self.threshold:
+                break
+            if _numbers(questions[position]) == numbers:
+                self.fuzzy_hits += 1
+                return answers[questions[position]]
+        self.misses += 1
+        return None
+
+    def stats(self):
+        return {
+            "questions": len(self._questions),
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "threshold": self.threshold,
+        }
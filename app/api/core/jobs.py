@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "500"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A unit of background work plus the state exposed to pollers."""
+
+    def __init__(self, kind, func, args, kwargs, cleanup=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._task = None
+        self._cleanup = cleanup
+
+    def discard(self):
+        """Runs the cleanup callback of a job that will never run (cancelled while queued, rejected or shut down)."""
+        cleanup, self._cleanup = self._cleanup, None
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"Error cleaning up job {self.id}: {str(e)}")
+
+    def report(self, progress=None, message=None):
+        """Updates progress (0..1) and message; safe to call from worker threads."""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            self.message = message
+
+    def raise_if_cancelled(self):
+        """Lets long-running (threaded) work stop at a safe point."""
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Bounded in-process job queue drained by a fixed pool of worker tasks."""
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_MAX_QUEUED, history_size=JOB_HISTORY_SIZE):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._worker_tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in self._jobs.values():
+            if job.status == QUEUED:
+                job.discard()
+
+    def submit(self, kind, func, *args, cleanup=None, **kwargs):
+        """Queues `func(job, *args, **kwargs)`, an async callable, and returns the job.
+
+        `cleanup()` runs only if the job never starts (rejected, cancelled while
+        queued or still queued at shutdown); once started, `func` owns cleanup.
+        """
+        job = Job(kind, func, args, kwargs, cleanup)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            job.discard()
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting).")
+        self._jobs[job.id] = job
+        self._trim_history()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job; returns the job or None if unknown."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job.cancel_requested = True
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED, message="Cancelled before start")
+            job.discard()
+        elif job._task is not None:
+            job._task.cancel()
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job.status = RUNNING
+        job._cleanup = None  # The job function cleans up after itself from here on
+        job.started_at = time.time()
+        job.message = "Running"
+        job._task = asyncio.create_task(job._func(job, *job._args, **job._kwargs))
+        try:
+            result = await job._task
+        except (asyncio.CancelledError, JobCancelled):
+            if not job.cancel_requested:
+                raise
+            self._finish(job, CANCELLED, message="Cancelled")
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed:\n{traceback.format_exc()}")
+            self._finish(job, FAILED, message="Failed", error=str(e))
+        else:
+            self._finish(job, SUCCEEDED, message=job.message if job.message != "Running" else "Done", result=result)
+            job.progress = 1.0
+
+    def _finish(self, job, status, message, result=None, error=None):
+        job.status = status
+        job.message = message
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job._task = None
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(len(self._jobs) - self.history_size, 0)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.api.core.vector_store import PersistentVectorStore
+
+KNOWLEDGE_MAX_LOADED_STORES = int(os.getenv("KNOWLEDGE_MAX_LOADED_STORES", "32"))
+KNOWLEDGE_MAX_MEMORY_MB = float(os.getenv("KNOWLEDGE_MAX_MEMORY_MB", "512"))
+
+# Scope used when there is no logged-in user or named collection; lives in the base directory
+SHARED_SCOPE = "shared"
+
+_COLLECTION_NAME = re.compile(r"^[\w-]{1,64}$")
+
+
+def user_scope(user):
+    return f"user:{user.get('email') or user.get('username')}"
+
+
+def collection_scope(name):
+    if not _COLLECTION_NAME.match(name):
+        raise ValueError("Collection names may only use letters, digits, '_' and '-' (max 64)")
+    return f"collection:{name}"
+
+
+class KnowledgeStores:
+    """Bounded LRU of per-scope PersistentVectorStores.
+
+    Stores are loaded on first use and evicted least-recently-used first
+    once more than `max_loaded` are open or their combined memory_bytes()
+    exceeds `max_bytes`. Eviction saves unsaved changes and drops the
+    store; the next checkout memory-maps it again. Checked-out stores are
+    pinned so a store is never evicted while a request or job is using it.
+    """
+
+    def __init__(self, directory, embeddings, max_loaded=KNOWLEDGE_MAX_LOADED_STORES,
+                 max_bytes=int(KNOWLEDGE_MAX_MEMORY_MB * 1024 * 1024)):
+        self.directory = directory
+        self.embeddings = embeddings
+        self.max_loaded = max_loaded
+        self.max_bytes = max_bytes
+        self._stores = OrderedDict()   # scope -> store, least recently used first
+        self._pins = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def _directory(self, scope):
+        if scope == SHARED_SCOPE:
+            return self.directory
+        # Readable prefix plus a hash, so distinct scopes never share a folder
+        safe = re.sub(r"[^\w.-]", "_", scope)[:48]
+        return os.path.join(self.directory, "scopes", f"{safe}-{hashlib.sha1(scope.encode('utf-8')).hexdigest()[:10]}")
+
+    @contextmanager
+    def checkout(self, scope):
+        """Yields the scope's store, loading it if needed and pinning it while in use."""
+        with self._lock:
+            store = self._stores.get(scope)
+            if store is None:
+                store = PersistentVectorStore(self._directory(scope), self.embeddings)
+                store.load()
+                self._stores[scope] = store
+                self.loads += 1
+            self._stores.move_to_end(scope)
+            self._pins[scope] = self._pins.get(scope, 0) + 1
+        try:
+            yield store
+        finally:
+            with self._lock:
+                self._pins[scope] -= 1
+                if not self._pins[scope]:
+                    del self._pins[scope]
+                self._evict()
+
+    def _evict(self):
+        total = sum(store.memory_bytes() for store in self._stores.values())
+        for scope in list(self._stores):
+            if len(self._stores) <= self.max_loaded and total <= self.max_bytes:
+                break
+            if scope in self._pins:
+                continue
+            store = self._stores.pop(scope)
+            if store.dirty:
+                store.save()  # Spill unsaved changes before dropping the index
+            total -= store.memory_bytes()
+            self.evictions += 1
+
+    def save_all(self):
+        with self._lock:
+            for store in self._stores.values():
+                if store.dirty:
+                    store.save()
+
+    def stats(self):
+        with self._lock:
+            stores = {scope: {"chunks": len(store), "memory_bytes": store.memory_bytes()} for scope, store in self._stores.items()}
+            return {
+                "loaded": len(stores),
+                "memory_bytes": sum(store["memory_bytes"] for store in stores.values()),
+                "max_loaded": self.max_loaded,
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "stores": stores,
+            }
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity above which a near-duplicate query reuses an answer; 0 disables the tier
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+
+def normalize_query(query):
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """TTL + LRU cache of LLM answers keyed by (template, context hash, normalized query).
+
+    With a semantic threshold and an embeddings model, a miss falls back to
+    the most similar cached query under the same template and context.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 embeddings=None, semantic_threshold=LLM_CACHE_SEMANTIC_THRESHOLD):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()   # key -> (expires_at, scope, query vector, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def semantic_enabled(self):
+        return self.embeddings is not None and self.semantic_threshold > 0
+
+    def _scope(self, template, context):
+        return f"{template}:{_hash(context)}"
+
+    def _embed(self, query):
+        vector = np.asarray(self.embeddings.embed_query(query), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, template, context, query):
+        scope = self._scope(template, context)
+        normalized = normalize_query(query)
+        key = _hash(f"{scope}:{normalized}")
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            if entry:
+                del self._entries[key]
+            if not self.semantic_enabled or not normalized:
+                self.misses += 1
+                return None
+            candidates = [(k, e) for k, e in self._entries.items() if e[1] == scope and e[2] is not None and e[0] > now]
+        if candidates:
+            vector = self._embed(normalized)
+            scores = np.stack([e[2] for _, e in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.semantic_threshold:
+                with self._lock:
+                    self.semantic_hits += 1
+                    if candidates[best][0] in self._entries:
+                        self._entries.move_to_end(candidates[best][0])
+                return candidates[best][1][3]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, template, context, query, response):
+        scope = self._scope(template, context)
+        normalized = normalize_query(query)
+        vector = self._embed(normalized) if self.semantic_enabled and normalized else None
+        with self._lock:
+            key = _hash(f"{scope}:{normalized}")
+            self._entries[key] = (time.time() + self.ttl, scope, vector, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "semantic_threshold": self.semantic_threshold if self.semantic_enabled else None,
+            }
@@ -0,0 +1,126 @@
+import asyncio
+import re
+import threading
+import unicodedata
+from app.api.core.database import db
+
+
+def name_tokens(text):
+    """Lower-cased, accent-folded word tokens used for both names and queries."""
+    folded = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return tuple(re.findall(r"\w+", folded.lower()))
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class NameIndex:
+    """Token trie over normalized student names.
+
+    find() walks the query once, following the trie from each token and
+    keeping the longest full name that matches, so detection costs
+    O(query tokens x name length) regardless of how many students exist.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._names = {}  # student id -> name tokens
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, student_id, name):
+        tokens = name_tokens(name or "")
+        if not tokens:
+            return
+        with self._lock:
+            self._remove(student_id)
+            node = self._root
+            for token in tokens:
+                node = node.children.setdefault(token, _Node())
+            node.ids.add(student_id)
+            self._names[student_id] = tokens
+
+    def remove(self, student_id):
+        with self._lock:
+            self._remove(student_id)
+
+    def _remove(self, student_id):
+        tokens = self._names.pop(student_id, None)
+        if tokens is None:
+            return
+        path = [self._root]
+        for token in tokens:
+            path.append(path[-1].children[token])
+        path[-1].ids.discard(student_id)
+        # Prune branches that no longer lead to any name
+        for depth in range(len(tokens), 0, -1):
+            node = path[depth]
+            if node.ids or node.children:
+                break
+            del path[depth - 1].children[tokens[depth - 1]]
+
+    def rebuild(self, students):
+        with self._lock:
+            self._root = _Node()
+            self._names = {}
+        for student in students:
+            self.add(student["_id"], student.get("name"))
+
+    def lookup(self, name):
+        """Ids of students whose normalized name equals `name`."""
+        node = self._root
+        for token in name_tokens(name):
+            node = node.children.get(token)
+            if node is None:
+                return []
+        return sorted(node.ids)
+
+    def find(self, query):
+        """Returns [(matched name, [student ids])] for names mentioned in the query, longest first."""
+        tokens = name_tokens(query)
+        matches = []
+        with self._lock:
+            position = 0
+            while position < len(tokens):
+                node, best = self._root, None
+                for offset in range(position, len(tokens)):
+                    node = node.children.get(tokens[offset])
+                    if node is None:
+                        break
+                    if node.ids:
+                        best = (offset + 1, sorted(node.ids))
+                if best:
+                    matches.append((" ".join(tokens[position:best[0]]), best[1]))
+                    position = best[0]
+                else:
+                    position += 1
+        return sorted(matches, key=lambda match: -len(match[0]))
+
+
+student_names = NameIndex()
+
+
+def _on_student_change(event, student_id, document):
+    if event == "reset":
+        asyncio.get_running_loop().create_task(_reload_student_names())
+    elif event == "delete":
+        student_names.remove(student_id)
+    elif document is not None and "name" in document:
+        student_names.add(student_id, document["name"])
+
+
+async def _reload_student_names():
+    student_names.rebuild(await db.get_students())
+
+
+async def load_student_names():
+    """Builds the index from the student snapshot and keeps it in sync with later writes."""
+    await _reload_student_names()
+    db.add_student_listener(_on_student_change)
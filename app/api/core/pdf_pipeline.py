@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF to handle PDF files
+from langchain.text_splitter import CharacterTextSplitter
+from app.api.core.metrics import span
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+PDF_PREVIEW_CHARS = int(os.getenv("PDF_PREVIEW_CHARS", "20000"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Shared process pool; spawned so workers do not inherit the server's threads."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def _extract_range(file_location, start, stop):
+    """Runs in a worker process: returns [(page number, text)] for pages [start, stop)."""
+    with fitz.open(file_location) as pdf_document:
+        return [(number + 1, pdf_document[number].get_text("text")) for number in range(start, stop)]
+
+
+def page_count(file_location):
+    with fitz.open(file_location) as pdf_document:
+        return pdf_document.page_count
+
+
+def iter_pages(file_location):
+    """Yields (page number, text) in order while later pages are still being extracted."""
+    total = page_count(file_location)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, total)) for start in range(0, total, PDF_PAGES_PER_TASK)]
+    if len(ranges) <= 1:
+        with span("pdf.extract"):
+            pages = _extract_range(file_location, 0, total)
+        yield from pages
+        return
+    executor = _get_executor()
+    futures = [executor.submit(_extract_range, file_location, start, stop) for start, stop in ranges]
+    try:
+        for future in futures:
+            with span("pdf.extract"):  # Time spent waiting on the extraction workers
+                pages = future.result()
+            yield from pages
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def ingest_pdf(file_location, store, document_id, on_progress=None):
+    """Extracts, chunks and embeds a PDF page by page into `store`.
+
+    Chunks carry their page number and are embedded in batches of
+    EMBED_BATCH_SIZE, so memory stays bounded by one batch of text rather
+    than the whole document. `on_progress(pages_done, page_count)` is called
+    after every page and may raise to abort. Returns page/chunk counts and
+    a preview of the leading text for summarization.
+
+    The new chunks are built under a staging id and only replace the old
+    copy of the document once every page has been stored; a failure or
+    cancellation removes them and leaves the previous version in place.
+    """
+    text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    source = document_id.split(":", 1)[-1]  # Original file name; the spooled copy has a unique prefix
+    total_pages = page_count(file_location)
+    texts, metadatas = [], []
+    preview, preview_length, chunk_count, pages = [], 0, 0, 0
+
+    staging_id = store.staging_document_id(document_id)
+    try:
+        with span("pdf.ingest"):
+            for number, text in iter_pages(file_location):
+                pages += 1
+                if preview_length < PDF_PREVIEW_CHARS:
+                    preview.append(text[:PDF_PREVIEW_CHARS - preview_length])
+                    preview_length += len(preview[-1])
+                for chunk in text_splitter.split_text(text):
+                    texts.append(chunk)
+                    metadatas.append({"source": source, "page": number})
+                while len(texts) >= EMBED_BATCH_SIZE:
+                    store.add_texts(staging_id, texts[:EMBED_BATCH_SIZE], metadatas[:EMBED_BATCH_SIZE])
+                    chunk_count += EMBED_BATCH_SIZE
+                    del texts[:EMBED_BATCH_SIZE], metadatas[:EMBED_BATCH_SIZE]
+                if on_progress:
+                    on_progress(pages, total_pages)
+            if texts:
+                store.add_texts(staging_id, texts, metadatas)
+                chunk_count += len(texts)
+    except BaseException:
+        store.delete_document(staging_id)
+        raise
+    if not store.rename_document(staging_id, document_id):
+        store.delete_document(document_id)  # The new version has no text
+    return {"pages": pages, "chunks": chunk_count, "preview": "".join(preview)}
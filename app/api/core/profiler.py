@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Off unless switched on at runtime (POST /admin/profiler/start) or by PROFILER_ENABLED at startup
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_MAX_DEPTH = 64
+
+
+def _stack(frame):
+    names = []
+    while frame is not None and len(names) < PROFILER_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval from a daemon thread.
+
+    Samples are aggregated as collapsed stacks ("outer;inner count" lines),
+    the input format of flamegraph.pl and speedscope. The sampler only
+    reads frames, so the cost is one stack walk per thread per interval
+    and nothing at all while stopped.
+    """
+
+    def __init__(self, interval_ms=PROFILER_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._samples = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.started_at = None
+        self.sample_count = 0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = [_stack(frame) for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                self._samples.update(stacks)
+                self.sample_count += 1
+
+    def collapsed(self, limit=None):
+        """Collapsed stacks, most sampled first."""
+        with self._lock:
+            items = self._samples.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in items) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.sample_count = 0
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "started_at": self.started_at,
+            "samples": self.sample_count,
+            "distinct_stacks": len(self._samples),
+        }
+
+
+profiler = SamplingProfiler()
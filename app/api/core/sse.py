@@ -0,0 +1,35 @@
+import json
+import traceback
+from fastapi.responses import StreamingResponse
+from app.api.core.concurrency import Overloaded
+
+
+def sse_event(data, event=None):
+    """Formats one Server-Sent Event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, default=str)}\n\n"
+
+
+async def _sse_events(tokens):
+    try:
+        async for token in tokens:
+            if isinstance(token, str):
+                yield sse_event({"token": token})
+            else:
+                yield sse_event({"response": token}, event="result")
+        yield sse_event({}, event="done")
+    except Overloaded as e:
+        yield sse_event({"error": str(e)}, event="error")
+    except Exception as e:
+        print("Error while streaming:", str(e))
+        print(traceback.format_exc())
+        yield sse_event({"error": "An error occurred while generating the response."}, event="error")
+
+
+def sse_response(tokens):
+    """Streams an async iterator of tokens as text/event-stream."""
+    return StreamingResponse(
+        _sse_events(tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,89 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+from openpyxl import Workbook
+from app.api.core.database import db
+from app.api.core.student_import import STUDENT_COLUMNS
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_SIZE = 256 * 1024
+
+# Same column order as the importer, so an export can be re-imported as-is
+EXPORT_COLUMNS = ("id",) + STUDENT_COLUMNS
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+async def iter_student_batches(query_filter, batch_size=EXPORT_BATCH_SIZE):
+    """Yields lists of export rows; the server cursor keeps only one batch in memory."""
+    projection = {field: 1 for field in STUDENT_COLUMNS}
+    cursor = db.collection.find(query_filter or {}, projection).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    async for student in cursor:
+        student["id"] = str(student.pop("_id"))
+        batch.append([student.get(column) for column in EXPORT_COLUMNS])
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def export_csv(query_filter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in iter_student_batches(query_filter):
+        writer.writerows(["" if value is None else value for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")  # Header only: nothing matched
+
+
+async def export_jsonl(query_filter):
+    async for batch in iter_student_batches(query_filter):
+        lines = (json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) for row in batch)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _append_rows(sheet, rows):
+    for row in rows:
+        sheet.append(row)
+
+
+def _read_chunk(f):
+    return f.read(EXPORT_CHUNK_SIZE)
+
+
+async def export_xlsx(query_filter):
+    """XLSX is a zip, so rows go to a write-only workbook on disk first and the file is then streamed."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Students")
+    sheet.append(EXPORT_COLUMNS)
+    async for batch in iter_student_batches(query_filter):
+        await asyncio.to_thread(_append_rows, sheet, batch)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as f:
+            while chunk := await asyncio.to_thread(_read_chunk, f):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_students(query_filter, export_format):
+    """Returns an async iterator of bytes for the requested format."""
+    exporters = {"csv": export_csv, "jsonl": export_jsonl, "xlsx": export_xlsx}
+    return exporters[export_format](query_filter)
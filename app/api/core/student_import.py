@@ -0,0 +1,103 @@
+import asyncio
+import os
+from datetime import date, datetime
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from app.api.core.database.db import insert_students
+from app.api.models.student import Student
+
+EXCEL_IMPORT_BATCH_SIZE = int(os.getenv("EXCEL_IMPORT_BATCH_SIZE", "1000"))
+EXCEL_IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("EXCEL_IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+STUDENT_COLUMNS = ("name", "student_id", "student_class", "dob", "gender", "city", "marks")
+
+
+def _clean_cell(value):
+    """Normalizes spreadsheet cell values before validation."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_excel_rows(file_location):
+    """Streams the first sheet row by row as (row number, {column: value})."""
+    workbook = load_workbook(file_location, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(cell).strip().lower() if cell is not None else None for cell in header]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, {
+                column: _clean_cell(value)
+                for column, value in zip(columns, values)
+                if column in STUDENT_COLUMNS and value is not None
+            }
+    finally:
+        workbook.close()
+
+
+def excel_row_count(file_location):
+    """Data rows declared by the sheet dimensions (None when the file omits them)."""
+    workbook = load_workbook(file_location, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+        return max_row - 1 if max_row else None
+    finally:
+        workbook.close()
+
+
+def iter_validated_batches(file_location, batch_size):
+    """Yields (documents, row numbers, row errors, last row read) for each batch of rows."""
+    documents, row_numbers, errors = [], [], []
+    row_number = 1
+    for row_number, row in iter_excel_rows(file_location):
+        try:
+            student = Student(**row)
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+            })
+        else:
+            documents.append(student.model_dump(exclude_none=True))
+            row_numbers.append(row_number)
+        if len(documents) >= batch_size:
+            yield documents, row_numbers, errors, row_number
+            documents, row_numbers, errors = [], [], []
+    if documents or errors:
+        yield documents, row_numbers, errors, row_number
+
+
+async def import_students_from_excel(file_location, batch_size=EXCEL_IMPORT_BATCH_SIZE, on_progress=None):
+    """Validates and bulk-inserts students, reporting failures per row.
+
+    `on_progress(rows_read, total_rows)` is called after every batch.
+    """
+    report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def add_errors(errors):
+        report["failed"] += len(errors)
+        room = EXCEL_IMPORT_MAX_REPORTED_ERRORS - len(report["errors"])
+        report["errors"].extend(errors[:max(room, 0)])
+        report["errors_truncated"] = report["errors_truncated"] or len(errors) > room
+
+    # Parsing is blocking, so each batch is read in a worker thread
+    total_rows = await asyncio.to_thread(excel_row_count, file_location) if on_progress else None
+    batches = iter_validated_batches(file_location, batch_size)
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        documents, row_numbers, errors, last_row = batch
+        add_errors(errors)
+        inserted, write_errors = await insert_students(documents)
+        report["inserted"] += inserted
+        add_errors([{"row": row_numbers[index], "error": message} for index, message in write_errors])
+        if on_progress:
+            on_progress(last_row - 1, total_rows)
+    return report
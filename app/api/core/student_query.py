@@ -0,0 +1,157 @@
+import os
+import re
+import time
+from bson import ObjectId
+from app.api.core.database import db
+from app.api.core.name_index import student_names
+
+STUDENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("STUDENT_CONTEXT_TOKEN_BUDGET", "1500"))
+CITY_CACHE_SECONDS = 60
+
+CONTEXT_FIELDS = ("name", "student_class", "gender", "city", "marks")
+
+_CLASS_PATTERNS = (
+    re.compile(r"\b(?:class|grade|std|standard)\s*[-:]?\s*(\d{1,2})\b"),
+    re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)\s+(?:class|grade|standard|std)\b"),
+)
+_MARKS_BETWEEN = re.compile(r"\bbetween\s+(\d+)\s+(?:and|-|to)\s+(\d+)")
+_MARKS_BOUNDS = (
+    (re.compile(r"(?:\b(?:at least|minimum of)|>=)\s*(\d+)"), "$gte"),
+    (re.compile(r"(?:\b(?:at most|maximum of)|<=)\s*(\d+)"), "$lte"),
+    (re.compile(r"(?:\b(?:above|over|more than|greater than|higher than)|>)\s*(\d+)"), "$gt"),
+    (re.compile(r"(?:\b(?:below|under|less than|lower than)|<)\s*(\d+)"), "$lt"),
+)
+# A bound only filters marks when marks are mentioned right before it or right after the number
+_MARKS_BEFORE = re.compile(r"\b(?:marks?|scores?|scored|scoring|percentage|got|getting)\b[\w\s]{0,12}$")
+_MARKS_AFTER = re.compile(r"^\s*(?:%|\b(?:marks?|points?|percent|percentage)\b)")
+# "... at least 250 and at most 400": a second bound joined to an accepted one
+_MARKS_CHAINED = re.compile(r"\d+\s*%?\s+(?:and|but)\s+$")
+_MARKS_SYMBOLS = {"$gte": "≥", "$lte": "≤", "$gt": ">", "$lt": "<"}
+_TOP = re.compile(r"\b(?:top|best|highest)\s*(\d+)?")
+_BOTTOM = re.compile(r"\b(?:bottom|worst|lowest|weakest)\s*(\d+)?")
+
+_cities = {"values": [], "loaded_at": 0.0}
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+async def _known_cities():
+    if time.time() - _cities["loaded_at"] > CITY_CACHE_SECONDS:
+        values = await db.collection.distinct("city")
+        _cities["values"] = sorted({str(city).strip().lower() for city in values if city}, key=len, reverse=True)
+        _cities["loaded_at"] = time.time()
+    return _cities["values"]
+
+
+def _about_marks(text, match, chained=False):
+    """Whether a numeric bound is about marks ("scored above 300", "over 80%") rather than age, year or count."""
+    before = text[:match.start()]
+    return bool(_MARKS_BEFORE.search(before) or _MARKS_AFTER.match(text[match.end():]) or (chained and _MARKS_CHAINED.search(before)))
+
+
+async def plan_student_query(question):
+    """Turns a question into a MongoDB filter plus an intent (count/average/top/bottom/list)."""
+    text = question.lower()
+    conditions = []
+    scope = []  # Human-readable version of the conditions, for the prompt
+
+    for pattern in _CLASS_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            conditions.append({"student_class": {"$in": [match.group(1), int(match.group(1))]}})
+            scope.append(f"class {int(match.group(1))}")
+            break
+
+    if re.search(r"\b(?:girls?|female)\b", text):
+        conditions.append({"gender": {"$regex": "^female$", "$options": "i"}})
+        scope.append("female")
+    elif re.search(r"\b(?:boys?|male)\b", text):
+        conditions.append({"gender": {"$regex": "^male$", "$options": "i"}})
+        scope.append("male")
+
+    for city in await _known_cities():
+        if re.search(rf"\b{re.escape(city)}\b", text):
+            conditions.append({"city": {"$regex": f"^{re.escape(city)}$", "$options": "i"}})
+            scope.append(f"city {city.title()}")
+            break
+
+    marks = {}
+    between = next((match for match in _MARKS_BETWEEN.finditer(text) if _about_marks(text, match)), None)
+    if between:
+        low, high = sorted(int(value) for value in between.groups())
+        marks = {"$gte": low, "$lte": high}
+    else:
+        bounds = [(match, operator) for pattern, operator in _MARKS_BOUNDS for match in pattern.finditer(text)]
+        for match, operator in sorted(bounds, key=lambda bound: bound[0].start()):
+            if operator not in marks and _about_marks(text, match, chained=bool(marks)):
+                marks[operator] = int(match.group(1))
+    if marks:
+        conditions.append({"marks": marks})
+        scope.extend(f"marks {_MARKS_SYMBOLS[operator]} {value}" for operator, value in marks.items())
+
+    matches = student_names.find(question)
+    if matches:
+        ids = [ObjectId(student_id) for _, student_ids in matches for student_id in student_ids]
+        conditions.append({"_id": {"$in": ids}})
+        scope.append("named " + " or ".join(name.title() for name, _ in matches))
+
+    plan = {"filter": {"$and": conditions} if conditions else {}, "scope": scope, "intent": "list", "sort": None, "limit": None}
+    if re.search(r"\b(?:how many|count|number of)\b", text):
+        plan["intent"] = "count"
+    elif re.search(r"\b(?:average|mean|avg)\b", text):
+        plan["intent"] = "average"
+    else:
+        for intent, pattern, direction in (("top", _TOP, -1), ("bottom", _BOTTOM, 1)):
+            match = pattern.search(text)
+            if match:
+                plan.update(intent=intent, sort=[("marks", direction)], limit=int(match.group(1) or 5))
+                break
+    return plan
+
+
+def _describe(plan):
+    """Short summary of the filter, e.g. "class 10, female, marks ≥ 300"; the raw query would only cost tokens."""
+    return ", ".join(plan["scope"]) if plan["scope"] else "all students"
+
+
+async def build_student_context(question, token_budget=STUDENT_CONTEXT_TOKEN_BUDGET):
+    """Runs the planned query and renders only what the answer needs, within a token budget."""
+    plan = await plan_student_query(question)
+    query_filter = plan["filter"]
+    total = await db.collection.count_documents(query_filter)
+    lines = [f"Query scope: {_describe(plan)}", f"Matching students: {total}"]
+
+    if total and plan["intent"] in ("average", "list"):
+        cursor = await db.collection.aggregate([
+            {"$match": query_filter},
+            {"$group": {"_id": None, "average": {"$avg": "$marks"}, "min": {"$min": "$marks"}, "max": {"$max": "$marks"}}},
+        ])
+        summary = await cursor.to_list(1)
+        if summary and summary[0]["average"] is not None:
+            lines.append(f"Marks: average {summary[0]['average']:.1f}, min {summary[0]['min']}, max {summary[0]['max']}")
+    if not total or plan["intent"] in ("count", "average"):
+        return "\n".join(lines)
+
+    lines.append(",".join(CONTEXT_FIELDS))
+    used = estimate_tokens("\n".join(lines))
+    cursor = db.collection.find(query_filter, {field: 1 for field in CONTEXT_FIELDS} | {"_id": 0})
+    if plan["sort"]:
+        cursor = cursor.sort(plan["sort"])
+    if plan["limit"]:
+        cursor = cursor.limit(plan["limit"])
+    shown = 0
+    async for student in cursor.batch_size(200):
+        row = ",".join(str(student.get(field, "")) for field in CONTEXT_FIELDS)
+        cost = estimate_tokens(row)
+        if used + cost > token_budget:
+            break
+        lines.append(row)
+        used += cost
+        shown += 1
+    expected = min(total, plan["limit"]) if plan["limit"] else total
+    if shown < expected:
+        lines.append(f"({expected - shown} more matching students omitted to fit the context budget)")
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+import json
+import os
+import re
+from youtube_transcript_api import YouTubeTranscriptApi
+
+TRANSCRIPT_CACHE_DIRECTORY = os.getenv("TRANSCRIPT_CACHE_DIRECTORY", "transcript_cache")
+TRANSCRIPT_WINDOW_SECONDS = float(os.getenv("TRANSCRIPT_WINDOW_SECONDS", "60"))
+
+_VIDEO_ID = re.compile(r"^[0-9A-Za-z_-]{11}$")
+
+
+def youtube_fetcher(video_id):
+    """Default fetcher: [{"text", "start", "duration"}] from YouTube's caption API."""
+    return YouTubeTranscriptApi.get_transcript(video_id)
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class TranscriptCache:
+    """Timestamped transcripts stored on disk by video id.
+
+    `fetcher(video_id)` is only called on a cache miss and can be swapped
+    (e.g. for a local fake) by assigning `transcripts.fetcher`.
+    """
+
+    def __init__(self, directory=TRANSCRIPT_CACHE_DIRECTORY, fetcher=youtube_fetcher):
+        self.directory = directory
+        self.fetcher = fetcher
+
+    def _path(self, video_id):
+        if not _VIDEO_ID.match(video_id):
+            raise ValueError(f"Invalid YouTube video id: {video_id!r}")
+        return os.path.join(self.directory, f"{video_id}.json")
+
+    def get(self, video_id):
+        path = self._path(video_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        segments = [
+            {"text": part["text"], "start": float(part["start"]), "duration": float(part.get("duration", 0))}
+            for part in self.fetcher(video_id)
+        ]
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(segments, f)
+        os.replace(path + ".tmp", path)
+        return segments
+
+
+transcripts = TranscriptCache()
+
+
+def chunk_by_time(segments, window_seconds=TRANSCRIPT_WINDOW_SECONDS):
+    """Groups segments into windows of about `window_seconds`; returns [(text, {"start", "end"})]."""
+    chunks, texts, window_start, window_end = [], [], None, 0.0
+    for segment in segments:
+        text = " ".join(segment["text"].split())
+        if not text:
+            continue
+        if window_start is not None and segment["start"] - window_start >= window_seconds:
+            chunks.append((" ".join(texts), {"start": window_start, "end": window_end}))
+            texts, window_start = [], None
+        if window_start is None:
+            window_start = segment["start"]
+        texts.append(text)
+        window_end = segment["start"] + segment["duration"]
+    if texts:
+        chunks.append((" ".join(texts), {"start": window_start, "end": window_end}))
+    return chunks
@@ -0,0 +1,32 @@
+import asyncio
+import os
+import uuid
+from fastapi import UploadFile
+
+UPLOAD_DIRECTORY = "uploads"
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+if not os.path.exists(UPLOAD_DIRECTORY):
+    os.makedirs(UPLOAD_DIRECTORY)
+
+
+async def spool_upload(file: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Copies an upload to UPLOAD_DIRECTORY chunk by chunk and returns its path.
+
+    Each upload gets its own file, so concurrent uploads of the same name do not clash.
+    """
+    file_location = os.path.join(UPLOAD_DIRECTORY, f"{uuid.uuid4().hex}-{os.path.basename(file.filename)}")
+    with open(file_location, "wb") as f:
+        while chunk := await file.read(chunk_size):
+            await asyncio.to_thread(f.write, chunk)
+    return file_location
+
+
+def remove_upload(file_location):
+    """Deletes a spooled upload once it has been processed (or will never be)."""
+    try:
+        os.remove(file_location)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error removing upload {file_location}: {str(e)}")
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import uuid
+import faiss
+import numpy as np
+from langchain.schema import Document
+from app.api.core.bm25 import BM25Index
+from app.api.core.metrics import span
+
+VECTOR_STORE_DIRECTORY = os.getenv("VECTOR_STORE_DIRECTORY", "vector_store")
+# Candidates taken from each retriever before reciprocal rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = 60
+# Marks chunks of a document that is still being ingested; hidden from search until renamed
+STAGING_MARKER = "#staging-"
+
+# Flat-code mmap is only available in newer faiss builds
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+class PersistentVectorStore:
+    """On-disk FAISS index with document-level add, delete and replace.
+
+    Every chunk gets a stable int64 id in an IndexIDMap2, and chunks are
+    grouped by a caller-chosen document id (e.g. "pdf:syllabus.pdf").
+    Saves write a new generation of files and then atomically swap
+    manifest.json, so readers never see a half-written index. Loading
+    memory-maps the index; the first write reloads a private copy.
+    """
+
+    def __init__(self, directory, embeddings):
+        self.directory = directory
+        self.embeddings = embeddings
+        self.index = None
+        self.chunks = {}      # vector id -> {"document_id", "text", "metadata"}
+        self.documents = {}   # document id -> [vector ids]
+        self.next_id = 0
+        self.generation = 0
+        self._mmapped = False
+        self._text_chars = 0
+        self.bm25 = BM25Index()
+        self.dirty = False    # Changed since the last save
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def memory_bytes(self):
+        """Approximate resident size: flat float32 codes, int64 ids and chunk text."""
+        vectors = self.index.ntotal * (self.index.d * 4 + 8) if self.index is not None else 0
+        return vectors + self._text_chars
+
+    def _path(self, name, generation=None):
+        return os.path.join(self.directory, name.format(generation=self.generation if generation is None else generation))
+
+    def load(self):
+        """Memory-maps the last saved generation, if there is one."""
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+        with self._lock:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            self.generation = manifest["generation"]
+            with open(self._path("docstore-{generation}.json"), "r") as f:
+                docstore = json.load(f)
+            self.index = faiss.read_index(self._path("index-{generation}.faiss"), MMAP_FLAGS)
+            self._mmapped = True
+            self.next_id = docstore["next_id"]
+            self.chunks = {int(vector_id): chunk for vector_id, chunk in docstore["chunks"].items()}
+            self.documents = {}
+            for vector_id, chunk in self.chunks.items():
+                self.documents.setdefault(chunk["document_id"], []).append(vector_id)
+            self._text_chars = sum(len(chunk["text"]) for chunk in self.chunks.values())
+            self.bm25 = BM25Index()
+            for vector_id, chunk in self.chunks.items():
+                self.bm25.add(vector_id, chunk["text"])
+            self.dirty = False
+            # Drop staging chunks left behind by a process that died mid-ingest
+            for document_id in [document_id for document_id in self.documents if STAGING_MARKER in document_id]:
+                self.delete_document(document_id)
+        return True
+
+    def save(self):
+        """Writes a new generation and atomically points the manifest at it."""
+        with self._lock:
+            if self.index is None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            generation = self.generation + 1
+            index_path = self._path("index-{generation}.faiss", generation)
+            docstore_path = self._path("docstore-{generation}.json", generation)
+            faiss.write_index(self.index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
+            with open(docstore_path + ".tmp", "w") as f:
+                json.dump({"next_id": self.next_id, "chunks": self.chunks}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(docstore_path + ".tmp", docstore_path)
+
+            manifest_path = os.path.join(self.directory, "manifest.json")
+            with open(manifest_path + ".tmp", "w") as f:
+                json.dump({"generation": generation, "dimension": self.index.d}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            previous, self.generation = self.generation, generation
+            self.dirty = False
+            for name in ("index-{generation}.faiss", "docstore-{generation}.json"):
+                path = self._path(name, previous)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _writable_index(self, dimension):
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+        elif self._mmapped:
+            # Memory-mapped codes are read-only, so switch to an owned copy
+            self.index = faiss.read_index(self._path("index-{generation}.faiss"))
+            self._mmapped = False
+        return self.index
+
+    def _embed(self, texts):
+        return np.asarray(self.embeddings.embed_documents(list(texts)), dtype="float32")
+
+    def _add_vectors(self, document_id, vectors, texts, metadatas):
+        metadatas = metadatas or [{} for _ in texts]
+        index = self._writable_index(vectors.shape[1])
+        ids = np.arange(self.next_id, self.next_id + len(texts), dtype="int64")
+        index.add_with_ids(vectors, ids)
+        self.next_id += len(texts)
+        for vector_id, text, metadata in zip(ids.tolist(), texts, metadatas):
+            self.chunks[vector_id] = {"document_id": document_id, "text": text, "metadata": metadata}
+            self._text_chars += len(text)
+            self.bm25.add(vector_id, text)
+        self.documents.setdefault(document_id, []).extend(ids.tolist())
+        self.dirty = True
+        return ids.tolist()
+
+    def add_texts(self, document_id, texts, metadatas=None):
+        """Embeds and appends chunks to a document; returns their vector ids."""
+        if not texts:
+            return []
+        vectors = self._embed(texts)
+        with self._lock:
+            return self._add_vectors(document_id, vectors, texts, metadatas)
+
+    def delete_document(self, document_id):
+        """Removes every chunk of a document; returns False if it was unknown."""
+        with self._lock:
+            vector_ids = self.documents.pop(document_id, None)
+            if not vector_ids:
+                return False
+            index = self._writable_index(self.index.d)
+            index.remove_ids(np.asarray(vector_ids, dtype="int64"))
+            for vector_id in vector_ids:
+                text = self.chunks.pop(vector_id)["text"]
+                self._text_chars -= len(text)
+                self.bm25.remove(vector_id, text)
+            self.dirty = True
+        return True
+
+    def replace_document(self, document_id, texts, metadatas=None):
+        """Swaps a document's chunks for new ones in a single step."""
+        vectors = self._embed(texts) if texts else None
+        with self._lock:
+            self.delete_document(document_id)
+            return self._add_vectors(document_id, vectors, texts, metadatas) if texts else []
+
+    def staging_document_id(self, document_id):
+        """A private id to build a new version of a document under before swapping it in."""
+        return f"{document_id}{STAGING_MARKER}{uuid.uuid4().hex}"
+
+    def rename_document(self, document_id, new_document_id):
+        """Moves a document's chunks to another id, replacing whatever was stored under it."""
+        with self._lock:
+            vector_ids = self.documents.get(document_id)
+            if not vector_ids:
+                return False
+            self.delete_document(new_document_id)
+            del self.documents[document_id]
+            for vector_id in vector_ids:
+                self.chunks[vector_id]["document_id"] = new_document_id
+            self.documents[new_document_id] = vector_ids
+            self.dirty = True
+        return True
+
+    def has_document(self, document_id):
+        return document_id in self.documents
+
+    def list_documents(self):
+        return {document_id: len(vector_ids) for document_id, vector_ids in self.documents.items() if STAGING_MARKER not in document_id}
+
+    def _matching_ids(self, metadata_filter):
+        """Chunk ids whose metadata (or document_id) equals each filter value; lists mean any-of.
+
+        Chunks of documents still being staged are always excluded.
+        """
+        staging = any(STAGING_MARKER in document_id for document_id in self.documents)
+        if not metadata_filter and not staging:
+            return None
+        wanted = {key: set(value) if isinstance(value, (list, tuple, set)) else {value} for key, value in (metadata_filter or {}).items()}
+        matching = set()
+        for vector_id, chunk in self.chunks.items():
+            if STAGING_MARKER in chunk["document_id"]:
+                continue
+            fields = dict(chunk["metadata"], document_id=chunk["document_id"])
+            if all(fields.get(key) in values for key, values in wanted.items()):
+                matching.add(vector_id)
+        return matching
+
+    def _document(self, vector_id, **scores):
+        chunk = self.chunks[vector_id]
+        metadata = dict(chunk["metadata"], document_id=chunk["document_id"], **scores)
+        return Document(page_content=chunk["text"], metadata=metadata)
+
+    def _vector_ids(self, vector, k, allowed):
+        params = None
+        if allowed is not None:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.fromiter(allowed, dtype="int64")))
+        _, ids = self.index.search(vector, min(k, len(allowed) if allowed is not None else len(self.chunks)), params=params)
+        return [vector_id for vector_id in ids[0].tolist() if vector_id in self.chunks]
+
+    def hybrid_search(self, query, k=4, metadata_filter=None, candidates=HYBRID_CANDIDATES):
+        """Fuses vector and BM25 rankings with reciprocal rank fusion; returns the top k Documents.
+
+        Exact terms (roll numbers, subject codes, dates) that embeddings blur
+        are caught by BM25, while paraphrases still come from the vectors.
+        """
+        if not self.chunks:
+            return []
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype="float32")
+        with self._lock, span("vector_store.hybrid_search"):
+            allowed = self._matching_ids(metadata_filter)
+            if allowed is not None and not allowed:
+                return []
+            with span("vector_store.similarity_search"):
+                vector_ranking = self._vector_ids(vector, max(k, candidates), allowed)
+            rankings = [
+                vector_ranking,
+                [vector_id for vector_id, _ in self.bm25.search(query, max(k, candidates), allowed)],
+            ]
+            fused = {}
+            for ranking in rankings:
+                for rank, vector_id in enumerate(ranking):
+                    fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [self._document(vector_id, score=round(score, 6)) for vector_id, score in best]
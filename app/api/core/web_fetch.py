@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from html.parser import HTMLParser
+from typing import NamedTuple
+import httpx
+
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "10"))
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+URL_FETCH_MAX_CONNECTIONS = int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "20"))
+URL_CACHE_DIRECTORY = os.getenv("URL_CACHE_DIRECTORY", "url_cache")
+USER_AGENT = "school-management-bot/1.0"
+
+
+class FetchError(Exception):
+    pass
+
+
+class FetchResult(NamedTuple):
+    url: str
+    text: str
+    not_modified: bool  # True when the server answered 304 and the cached copy was used
+
+
+# ---------------------------------------------------------------------------
+# HTML to text
+# ---------------------------------------------------------------------------
+
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+
+class _ParagraphExtractor(HTMLParser):
+    """Collects <p> text in one pass, separating paragraphs inside the main content block.
+
+    The main block is Wikipedia's div#mw-content-text or the first <article>;
+    pages without one fall back to every paragraph on the page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.main = []
+        self.other = []
+        self._container = None      # Tag name of the main block while inside it
+        self._container_depth = 0
+        self._container_seen = False
+        self._skip_depth = 0
+        self._paragraph = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif self._container:
+            if tag == self._container:
+                self._container_depth += 1
+        elif not self._container_seen and (
+            tag == "article" or (tag == "div" and ("id", "mw-content-text") in attrs)
+        ):
+            self._container, self._container_depth, self._container_seen = tag, 1, True
+        if tag == "p":
+            self._end_paragraph()
+            self._paragraph = []
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag == "p":
+            self._end_paragraph()
+        elif tag == self._container:
+            self._container_depth -= 1
+            if not self._container_depth:
+                self._end_paragraph()
+                self._container = None
+
+    def handle_data(self, data):
+        if self._paragraph is not None and not self._skip_depth:
+            self._paragraph.append(data)
+
+    def _end_paragraph(self):
+        if self._paragraph is None:
+            return
+        text = " ".join("".join(self._paragraph).split())
+        if text:
+            (self.main if self._container else self.other).append(text)
+        self._paragraph = None
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+
+
+def html_to_text(html):
+    """Paragraph text of the page's main content, one paragraph per block."""
+    extractor = _ParagraphExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return "\n\n".join(extractor.main if extractor._container_seen else extractor.other)
+
+
+# ---------------------------------------------------------------------------
+# Shared client and on-disk cache
+# ---------------------------------------------------------------------------
+
+_client = None
+
+
+def get_http_client():
+    """One pooled client for all outbound fetches, created on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(URL_FETCH_TIMEOUT),
+            limits=httpx.Limits(max_connections=URL_FETCH_MAX_CONNECTIONS, max_keepalive_connections=URL_FETCH_MAX_CONNECTIONS),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _cache_path(url):
+    return os.path.join(URL_CACHE_DIRECTORY, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _read_cache(url):
+    try:
+        with open(_cache_path(url), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(url, entry):
+    os.makedirs(URL_CACHE_DIRECTORY, exist_ok=True)
+    path = _cache_path(url)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(path + ".tmp", path)
+
+
+async def _read_body(response):
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > URL_FETCH_MAX_BYTES:
+        raise FetchError(f"Page is larger than {URL_FETCH_MAX_BYTES} bytes")
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body.extend(chunk)
+        if len(body) > URL_FETCH_MAX_BYTES:
+            raise FetchError(f"Page is larger than {URL_FETCH_MAX_BYTES} bytes")
+    return bytes(body)
+
+
+async def fetch_page_text(url):
+    """Fetches a page's main text, revalidating any cached copy with ETag/Last-Modified.
+
+    The cache stores the extracted text, so an unchanged page (304) is
+    neither downloaded nor parsed again.
+    """
+    cached = await asyncio.to_thread(_read_cache, url)
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        async with get_http_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                return FetchResult(url, cached["text"], True)
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            if content_type and "html" not in content_type and "text" not in content_type:
+                raise FetchError(f"Unsupported content type: {content_type}")
+            body = await _read_body(response)
+            encoding = response.charset_encoding or "utf-8"
+            etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        raise FetchError(f"Could not fetch {url}: {str(e)}") from e
+
+    try:
+        html = body.decode(encoding, errors="replace")
+    except LookupError:
+        html = body.decode("utf-8", errors="replace")  # Unknown charset name in the header
+    text = await asyncio.to_thread(html_to_text, html)
+    if etag or last_modified:
+        entry = {"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time(), "text": text}
+        await asyncio.to_thread(_write_cache, url, entry)
+    return FetchResult(url, text, False)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, Form, Depends, HTTPException, APIRouter
+from fastapi import FastAPI, Request, Form, Depends, HTTPException, APIRouter, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse, JSONResponse
@@ -6,22 +6,75 @@ from pydantic import BaseModel
 from starlette.middleware.sessions import SessionMiddleware
 import os,re
 import traceback
-from dotenv import load_dotenv
 from fastapi import FastAPI, File, UploadFile
-import requests
-from bs4 import BeautifulSoup
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.agent import run_agent, upload_pdf, ask_question, fetch_transcript,upload_excel # Ensure these functions are correctly defined
+import asyncio
+from contextlib import asynccontextmanager
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables before any app module reads its settings at import time
 load_dotenv()
 
+from app.api.core.database.db import connect_db, close_db, watch_student_changes, backfill_name_keys, migrate_event_dates
+from app.api.core.database.indexes import ensure_indexes, MONGO_AUTO_INDEX
+from app.api.core.name_index import load_student_names
+from app.api.core.student_import import EXCEL_IMPORT_BATCH_SIZE
+from app.api.agent import knowledge, warm_up_models, run_agent, stream_agent, upload_pdf, ask_question, stream_question, upload_excel, ingest_url_job, ingest_transcript_job # Ensure these functions are correctly defined
+from app.api.core.jobs import job_manager
+from app.api.core.sse import sse_response
+from app.api.core.concurrency import Overloaded, llm_limiter, shutdown_executor as shutdown_embedding_executor
+from app.api.core.pdf_pipeline import shutdown_executor as shutdown_pdf_executor
+from app.api.core.web_fetch import close_http_client
+from app.api.core.ai_models import AI_WARMUP
+from app.api.core.metrics import MetricsMiddleware
+from app.api.core.profiler import profiler, PROFILER_ENABLED
+from app.api.routes.jobs import router as jobs_router, submit_job
+from app.api.routes.knowledge import router as knowledge_router, get_knowledge_scope
+
+# Open the pooled database client on startup and release it on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_db()
+    await backfill_name_keys()
+    await migrate_event_dates()
+    if MONGO_AUTO_INDEX:
+        await ensure_indexes()
+    await load_student_names()  # Also warms the student snapshot
+    watcher = asyncio.create_task(watch_student_changes())  # Change stream, or TTL reloads without one
+    await job_manager.start()
+    if PROFILER_ENABLED:
+        profiler.start()
+    # Serve non-AI routes right away; /ready turns 200 once the models have loaded
+    warmup = asyncio.create_task(warm_up_models()) if AI_WARMUP else None
+    yield
+    if warmup:
+        warmup.cancel()
+    await job_manager.stop()
+    profiler.stop()
+    knowledge.save_all()
+    watcher.cancel()
+    shutdown_pdf_executor()
+    shutdown_embedding_executor()
+    await close_http_client()
+    await close_db()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Securely load session secret key
 SECRET_KEY = os.getenv("SESSION_SECRET_KEY", "your_super_secret_key")
 
+# Saturated LLM/embedding queues answer 429/503 instead of piling up requests
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+# Single-student writes that collide with the unique (name, dob) natural key
+@app.exception_handler(DuplicateKeyError)
+async def duplicate_student_handler(request: Request, exc: DuplicateKeyError):
+    return JSONResponse(status_code=409, content={"detail": "A student with this name and date of birth already exists"})
+
 # Middleware for session-based authentication
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
@@ -34,15 +87,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, in-flight and error metrics, scraped from /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Jinja2 template setup for rendering HTML pages
 templates = Jinja2Templates(directory="templates")
 
 # Import routes
-from app.api.routes.routes import router
-from app.api.core.database.db import get_students
+from app.api.routes.routes import router, student_filter, StudentPage, render_student_page
+from app.api.core.database.db import get_events as fetch_events, add_event_to_db
+from app.api.models.student import Event
 from app.api.routes.events import router as event_router
-from app.api.core.database.db import events_collection
 from app.api.auth.google_auth import router as google_auth_router
+from app.api.auth.session import get_current_user
+from app.api.routes.admin import router as admin_router
+from app.api.routes.health import router as health_router
 from fastapi.responses import FileResponse
 
 # Include authentication routes
@@ -56,37 +115,51 @@ class ChatRequest(BaseModel):
     message: str
 
 @app.post("/chatbot")
-async def chatbot_endpoint(request: ChatRequest):
+async def chatbot_endpoint(request: ChatRequest, scope: str = Depends(get_knowledge_scope)):
     user_message = request.message.strip()
 
     try:
-        bot_response = run_agent(user_message)
+        bot_response = await run_agent(user_message, scope)
 
         if not bot_response or not isinstance(bot_response, str):
             return JSONResponse(content={"reply": "Sorry, I couldn't generate a response."})
 
         return JSONResponse(content={"reply": bot_response})
 
+    except Overloaded:
+        raise
     except Exception as e:
         print("Error in chatbot:", str(e))
         print(traceback.format_exc())
         return JSONResponse(content={"reply": "An error occurred."}, status_code=500)
 
+@app.post("/chatbot/stream")
+async def chatbot_stream_endpoint(request: ChatRequest, scope: str = Depends(get_knowledge_scope)):
+    """Streams the chatbot reply token by token as Server-Sent Events."""
+    llm_limiter.check()  # Reject before the stream starts; errors cannot change the status later
+    return sse_response(stream_agent(request.message.strip(), scope))
+
 # Home Route
 @app.post("/upload-pdf")
-async def upload_pdf_endpoint(file: UploadFile = File(...)):
-    return await upload_pdf(file)
+async def upload_pdf_endpoint(file: UploadFile = File(...), scope: str = Depends(get_knowledge_scope)):
+    return await upload_pdf(file, scope)
 
 @app.post("/upload-excel")
-async def upload_excel_endpoint(file: UploadFile = File(...)):
-    return await upload_excel(file)
+async def upload_excel_endpoint(file: UploadFile = File(...), batch_size: int = Query(EXCEL_IMPORT_BATCH_SIZE, gt=0, le=10000)):
+    return await upload_excel(file, batch_size)
 
 @app.get("/ask")
-async def ask_question_endpoint(query: str):
+async def ask_question_endpoint(query: str, scope: str = Depends(get_knowledge_scope)):
     """Handles queries related to students, FAQs, URL content, and PDF summarization."""
-    response = await ask_question(query)  # Ensure ask_question returns JSONResponse
+    response = await ask_question(query, scope)  # Ensure ask_question returns JSONResponse
     return response
 
+@app.get("/ask/stream")
+async def ask_question_stream_endpoint(query: str, scope: str = Depends(get_knowledge_scope)):
+    """Streaming variant of /ask using Server-Sent Events."""
+    llm_limiter.check()
+    return sse_response(stream_question(query, scope))
+
 # Login Page Route
 @app.get("/login")
 async def login_page(request: Request):
@@ -100,13 +173,6 @@ async def login(request: Request, username: str = Form(...), password: str = For
         return RedirectResponse(url="/dashboard", status_code=303)
     return RedirectResponse(url="/login", status_code=303)
 
-# Middleware to get the current user
-def get_current_user(request: Request):
-    user = request.session.get("user")
-    if not user:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    return user
-
 # Dashboard Page (Session Protected)
 @app.get("/dashboard")
 async def dashboard_page(request: Request, user: dict = Depends(get_current_user)):
@@ -115,9 +181,13 @@ async def dashboard_page(request: Request, user: dict = Depends(get_current_user
 
 # Student Page (Session Protected)
 @app.get("/students")
-async def student_page(request: Request, user: dict = Depends(get_current_user)):
-    students = get_students()
-    return templates.TemplateResponse("student.html", {"request": request, "students": students})
+async def student_page(
+    request: Request,
+    user: dict = Depends(get_current_user),
+    query_filter: dict = Depends(student_filter),
+    page: StudentPage = Depends(),
+):
+    return await render_student_page(request, query_filter, page)
 
 # Analytics Page (Session Protected)
 @app.get("/analytics")
@@ -133,25 +203,23 @@ async def logout(request: Request):
 # Include Additional API Routes
 app.include_router(router)
 app.include_router(event_router)
+app.include_router(jobs_router)
+app.include_router(knowledge_router)
+app.include_router(admin_router)
+app.include_router(health_router)
 
 # Events API (CRUD Operations)
 from bson import ObjectId
 
-class Event(BaseModel):
-    title: str
-    date: str  # Format: "YYYY-MM-DD"
-
 @app.post("/events")
 async def add_event(event: Event):
-    events_collection.insert_one(event.dict())
-    return {"message": "Event added successfully"}
+    event_id = await add_event_to_db(event.dict())
+    return {"message": "Event added successfully", "id": event_id}
 
+# Kept for older dashboards; /events accepts from/to/limit
 @app.get("/eventss")
 async def get_events():
-    events = list(events_collection.find({}))  # Fetch all events
-    for event in events:
-        event["_id"] = str(event["_id"])  # Convert ObjectId to string
-    return events
+    return await fetch_events()
 
 
 # New Route for URL Analysis
@@ -159,52 +227,21 @@ class URLRequest(BaseModel):
     url: str
 
 @app.post("/analyze-url")
-async def analyze_url_endpoint(request: URLRequest):
+async def analyze_url_endpoint(request: URLRequest, scope: str = Depends(get_knowledge_scope)):
     url = request.url.strip().rstrip(".")  # Remove any trailing period
-
-    try:
-        # Fetch the content of the URL
-        response = requests.get(url)
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx and 5xx)
-
-        # Parse the content using BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Extract text or specific data from the content
-        text_content = soup.get_text()
-
-        # Store the content for later use
-        global url_content
-        url_content = text_content
-        return JSONResponse(content={"message": "URL content stored successfully."})
-
-    except Exception as e:
-        print("Error analyzing URL:", str(e))
-        print(traceback.format_exc())
-        return JSONResponse(content={"error": "An error occurred while analyzing the URL."}, status_code=500)
+    return submit_job("url", ingest_url_job, url, scope)
     
 class YouTubeRequest(BaseModel):
     video_link: str
 
 @app.post("/process-video")
-async def process_video_endpoint(request: YouTubeRequest):
+async def process_video_endpoint(request: YouTubeRequest, scope: str = Depends(get_knowledge_scope)):
     video_link = request.video_link.strip()
 
-    try:
-        # Extract the video ID from the URL
-        video_id_match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", video_link)
-        if not video_id_match:
-            raise HTTPException(status_code=400, detail="Invalid YouTube URL.")
-
-        video_id = video_id_match.group(1)
+    # Extract the video ID from the URL
+    video_id_match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", video_link)
+    if not video_id_match:
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL.")
 
-        # Fetch the transcript using the video ID
-        transcript = fetch_transcript(video_id)
-        if transcript:
-            return JSONResponse(content={"transcript": transcript})
-        else:
-            raise HTTPException(status_code=500, detail="Unable to fetch the video transcript.")
-
-    except Exception as e:
-        print("Error processing video:", str(e))
-        raise HTTPException(status_code=500, detail="An error occurred while processing the video.")
\ No newline at end of file
+    # Fetch the transcript in the background
+    return submit_job("youtube", ingest_transcript_job, video_id_match.group(1), scope)
@@ -1,15 +1,70 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+from datetime import date
 
 class Student(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True, str_strip_whitespace=True)
+
     name: str
-    student_id: str
+    student_id: Optional[str] = None
     student_class: str
     dob: str
     gender: str
     city: str
     marks:int
+
+# Largest id list or batch accepted by the bulk endpoints
+BULK_MAX_ITEMS = 10000
+
+
+class StudentUpdate(BaseModel):
+    """Fields to set on every selected student; omitted fields are left unchanged."""
+    model_config = ConfigDict(coerce_numbers_to_str=True, str_strip_whitespace=True)
+
+    name: Optional[str] = None
+    student_class: Optional[str] = None
+    dob: Optional[str] = None
+    gender: Optional[str] = None
+    city: Optional[str] = None
+    marks: Optional[int] = None
+
+
+class StudentFilter(BaseModel):
+    student_class: Optional[str] = None
+    gender: Optional[str] = None
+    city: Optional[str] = None
+    min_marks: Optional[int] = None
+    max_marks: Optional[int] = None
+    name: Optional[str] = None
+
+
+class BulkSelection(BaseModel):
+    """Selects students either by id list or by filter."""
+    ids: Optional[List[str]] = Field(None, max_length=BULK_MAX_ITEMS)
+    filter: Optional[StudentFilter] = None
+
+
+class BulkUpdate(BulkSelection):
+    changes: StudentUpdate
+
+
+class Promotion(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True, str_strip_whitespace=True)
+
+    from_class: str
+    to_class: str
+
+
+class PromotionRequest(BaseModel):
+    promotions: List[Promotion] = Field(..., min_length=1)
+    filter: Optional[StudentFilter] = None  # Narrows every promotion, e.g. to one city
+
+
+class BulkUpsert(BaseModel):
+    students: List[Student] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
 # Pydantic Model for Event
 class Event(BaseModel):
     title: str
-    date: str
-    description: str
\ No newline at end of file
+    date: date  # Accepts "YYYY-MM-DD"; stored as a BSON datetime
+    description: str = ""
\ No newline at end of file
@@ -0,0 +1,43 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from app.api.auth.session import get_current_user
+from app.api.core.database import indexes
+from app.api.core.profiler import profiler
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+# ✅ Route to report missing, undeclared and unused indexes, plus duplicates blocking unique ones
+@router.get("/admin/indexes")
+async def get_index_report():
+    return await indexes.index_report()
+
+# ✅ Route to create any declared index that is missing
+@router.post("/admin/indexes/ensure")
+async def ensure_indexes():
+    return {"created": await indexes.ensure_indexes()}
+
+# ✅ Route to report whether the sampling profiler is running
+@router.get("/admin/profiler")
+async def profiler_status():
+    return profiler.stats()
+
+# ✅ Route to start sampling every thread's stack
+@router.post("/admin/profiler/start")
+async def start_profiler(reset: bool = False):
+    if reset:
+        profiler.reset()
+    profiler.start()
+    return profiler.stats()
+
+# ✅ Route to stop sampling; collected stacks are kept until the next reset
+@router.post("/admin/profiler/stop")
+async def stop_profiler():
+    profiler.stop()
+    return profiler.stats()
+
+# ✅ Route to download the samples as collapsed stacks (flamegraph.pl / speedscope input)
+@router.get("/admin/profiler/stacks", response_class=PlainTextResponse)
+async def profiler_stacks(limit: Optional[int] = Query(None, gt=0)):
+    return profiler.collapsed(limit)
@@ -1,35 +1,40 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from bson import ObjectId
 import logging
-from app.api.core.database.db import events_collection
+from app.api.core.database.db import get_events, add_event_to_db, delete_event_from_db
+from app.api.models.student import Event
 
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter()
 
-
-# ✅ Event Model
-class Event(BaseModel):
-    title: str
-    date: str
-    description: str
+# ✅ Route to list events in date order, optionally within a date range
+@router.get("/events")
+async def list_events(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(100, gt=0, le=1000),
+):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return await get_events(start, end, limit)
 
 # ✅ Route to Add an Event
 @router.post("/events/")
 async def add_event(event: Event):
     event_dict = event.dict()
-    result = events_collection.insert_one(event_dict)
-    return {"message": "Event added successfully", "id": str(result.inserted_id)}
+    event_id = await add_event_to_db(event_dict)
+    return {"message": "Event added successfully", "id": event_id}
 
 
 
 @router.post("/events/{event_id}")
+@router.delete("/events/{event_id}")
 async def delete_event(event_id: str):
-    event = events_collection.find({"_id": ObjectId(event_id)})
-    if not event:
+    if not await delete_event_from_db(event_id):
         raise HTTPException(status_code=404, detail="event not found")
 
-    events_collection.delete_one({"_id": ObjectId(event_id)})
     return {"message": "event deleted successfully"}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+from app.api.core import ai_models, metrics
+from app.api.core.database import db
+
+router = APIRouter()
+
+
+# ✅ Route for liveness probes: the process is up and serving
+@router.get("/health")
+async def health():
+    return {"status": "ok"}
+
+# ✅ Route for readiness probes: 503 until the database is connected and the AI models are loaded
+@router.get("/ready")
+async def ready():
+    models = ai_models.readiness()
+    is_ready = db.client is not None and ai_models.is_ready()
+    return JSONResponse(status_code=200 if is_ready else 503, content={
+        "ready": is_ready,
+        "database": db.client is not None,
+        "models": models,
+    })
+
+# ✅ Route for Prometheus scrapes: request and span metrics in the text exposition format
+@router.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
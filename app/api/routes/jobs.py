@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from app.api.core.jobs import job_manager, JobQueueFull
+
+router = APIRouter()
+
+
+def submit_job(kind, func, *args, **kwargs):
+    """Queues background work and returns a 202 response with the job handle."""
+    try:
+        job = job_manager.submit(kind, func, *args, **kwargs)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content={
+        "message": f"{kind} job queued.",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+    })
+
+
+# ✅ Route to list recent jobs
+@router.get("/jobs")
+async def list_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+# ✅ Route to poll a job's status and progress
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+# ✅ Route to cancel a queued or running job
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from app.api.agent import knowledge, embeddings, response_cache, faq
+from app.api.core.concurrency import run_embedding
+from app.api.core.knowledge_stores import SHARED_SCOPE, user_scope, collection_scope
+
+router = APIRouter()
+
+
+def get_knowledge_scope(request: Request, collection: Optional[str] = None):
+    """Knowledge store for a request: a named collection, else the session user's own, else shared."""
+    if collection:
+        try:
+            return collection_scope(collection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    user = request.session.get("user")
+    return user_scope(user) if user else SHARED_SCOPE
+
+
+def _list_documents(scope):
+    with knowledge.checkout(scope) as store:
+        return store.list_documents()
+
+
+def _delete_document(scope, document_id):
+    with knowledge.checkout(scope) as store:
+        if not store.delete_document(document_id):
+            return False
+        store.save()
+        return True
+
+
+# ✅ Route to list the documents held in the caller's FAISS index
+@router.get("/knowledge/documents")
+async def list_documents(scope: str = Depends(get_knowledge_scope)):
+    documents = await asyncio.to_thread(_list_documents, scope)
+    return [{"document_id": document_id, "chunks": chunks} for document_id, chunks in documents.items()]
+
+# ✅ Route to remove one document from the caller's FAISS index
+@router.post("/knowledge/documents/delete")
+async def delete_document(document_id: str, scope: str = Depends(get_knowledge_scope)):
+    if not await asyncio.to_thread(_delete_document, scope, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"message": "Document deleted successfully"}
+
+def _search(scope, query, k, metadata_filter):
+    with knowledge.checkout(scope) as store:
+        return store.hybrid_search(query, k=k, metadata_filter=metadata_filter)
+
+
+# ✅ Route to preview what hybrid retrieval returns for a query
+@router.get("/knowledge/search")
+async def search_knowledge(
+    query: str,
+    k: int = Query(4, gt=0, le=50),
+    document_id: Optional[str] = None,
+    source: Optional[str] = None,
+    scope: str = Depends(get_knowledge_scope),
+):
+    metadata_filter = {key: value for key, value in (("document_id", document_id), ("source", source)) if value}
+    docs = await run_embedding(_search, scope, query, k, metadata_filter or None)
+    return [{"text": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+# ✅ Route to report loaded knowledge stores and their memory use
+@router.get("/knowledge/stores")
+async def knowledge_store_stats():
+    return knowledge.stats()
+
+# ✅ Route to report FAQ match counters
+@router.get("/knowledge/faq")
+async def faq_stats():
+    return faq.stats()
+
+# ✅ Route to report embedding cache hit/miss counters
+@router.get("/knowledge/embedding-cache")
+async def embedding_cache_stats():
+    return await asyncio.to_thread(embeddings.stats)
+
+# ✅ Route to report LLM response cache counters
+@router.get("/knowledge/response-cache")
+async def response_cache_stats():
+    return response_cache.stats()
+
+# ✅ Route to drop every cached LLM response
+@router.post("/knowledge/response-cache/clear")
+async def clear_response_cache():
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
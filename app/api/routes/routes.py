@@ -1,19 +1,95 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Request, Form, HTTPException, Query, Depends
 from bson import ObjectId
 from fastapi.templating import Jinja2Templates
-from app.api.core.database.db import collection
+from fastapi.responses import StreamingResponse
+from datetime import date
+from app.api.core.database.db import (
+    get_students_version,
+    get_student_fields,
+    add_student_to_db,
+    update_student_in_db,
+    delete_student_from_db,
+    delete_students,
+    update_students,
+    update_student_groups,
+    upsert_students,
+)
+from app.api.core.student_export import export_students, EXPORT_FORMATS
+from app.api.models.student import BulkSelection, BulkUpdate, PromotionRequest, BulkUpsert
+from app.api.core.database import stats
+from app.api.core.database.listing import (
+    build_student_filter,
+    list_students,
+    InvalidCursor,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
 from collections import Counter
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-# ✅ Route to display all students
+def student_filter(
+    student_class: Optional[str] = None,
+    gender: Optional[str] = None,
+    city: Optional[str] = None,
+    min_marks: Optional[int] = Query(None, ge=0),
+    max_marks: Optional[int] = Query(None, ge=0),
+    name: Optional[str] = Query(None, description="Name prefix"),
+):
+    return build_student_filter(student_class, gender, city, min_marks, max_marks, name)
+
+
+class StudentPage:
+    """Sort and keyset cursor query parameters shared by the listing endpoints."""
+
+    def __init__(
+        self,
+        sort: str = "name",
+        order: str = Query("asc", pattern="^(asc|desc)$"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ):
+        self.sort = sort
+        self.descending = order == "desc"
+        self.limit = limit
+        self.cursor = cursor
+
+
+async def fetch_student_page(query_filter, page):
+    try:
+        return await list_students(query_filter, page.sort, page.descending, page.limit, page.cursor)
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def render_student_page(request, query_filter, page):
+    result = await fetch_student_page(query_filter, page)
+    for student in result["students"]:
+        student["id"] = student["_id"]
+    next_url = str(request.url.include_query_params(cursor=result["next_cursor"])) if result["next_cursor"] else None
+    return templates.TemplateResponse("student.html", {
+        "request": request,
+        "students": result["students"],
+        "next_url": next_url,
+        "params": request.query_params,
+    })
+
+# ✅ Route to display one page of students
 @router.get("/")
-def get_students(request: Request):
-    students = list(collection.find({}, {"_id": 1, "name": 1, "student_class": 1, "dob": 1, "gender": 1, "city": 1, "marks": 1}))
-    for student in students:
-        student["id"] = str(student["_id"])  # Convert ObjectId to string
-    return templates.TemplateResponse("student.html", {"request": request, "students": students})
+async def get_students(request: Request, query_filter: dict = Depends(student_filter), page: StudentPage = Depends()):
+    return await render_student_page(request, query_filter, page)
+
+# ✅ Route to list students as JSON (filter, sort and follow next_cursor to page)
+@router.get("/students/list")
+async def list_students_json(query_filter: dict = Depends(student_filter), page: StudentPage = Depends()):
+    return await fetch_student_page(query_filter, page)
+
+# ✅ Route to check whether cached student data is stale
+@router.get("/students/version")
+async def get_student_version():
+    return {"version": get_students_version()}
 
 # ✅ Route to add a student
 @router.post("/add/")
@@ -38,8 +114,8 @@ async def add_student(
         "city": city,
         "marks": marks
     }
-    result = collection.insert_one(student_data)
-    return {"message": "Student added successfully", "id": str(result.inserted_id)}
+    student_id = await add_student_to_db(student_data)
+    return {"message": "Student added successfully", "id": student_id}
 
 # ✅ Route to update a student
 @router.post("/update/{student_id}")
@@ -66,9 +142,7 @@ async def update_student(
         "marks": marks
     }
 
-    result = collection.update_one({"_id": ObjectId(student_id)}, {"$set": student_data})
-    
-    if result.matched_count == 0:
+    if not await update_student_in_db(student_id, student_data):
         raise HTTPException(status_code=404, detail="Student not found")
 
     return {"message": "Student updated successfully"}
@@ -76,28 +150,118 @@ async def update_student(
 # ✅ Route to delete a student
 @router.post("/delete/{student_id}")
 async def delete_student(student_id: str):
-    student = collection.find_one({"_id": ObjectId(student_id)})
-    if not student:
+    if not await delete_student_from_db(student_id):
         raise HTTPException(status_code=404, detail="Student not found")
 
-    collection.delete_one({"_id": ObjectId(student_id)})
     return {"message": "Student deleted successfully"}
 
+# ✅ Route to download students as CSV, JSONL or XLSX (same filters as the listing)
+@router.get("/students/export")
+async def export_students_file(
+    format: str = Query("csv", pattern="^(csv|jsonl|xlsx)$"),
+    query_filter: dict = Depends(student_filter),
+):
+    filename = f"students-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        export_students(query_filter, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def _selection(body: BulkSelection):
+    """Returns (ids, filter) for a bulk request; exactly one must be given and filters may not be empty."""
+    if (body.ids is None) == (body.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either 'ids' or 'filter'")
+    if body.ids is not None:
+        return body.ids, None
+    query_filter = build_student_filter(**body.filter.model_dump())
+    if not query_filter:
+        raise HTTPException(status_code=400, detail="Filter must have at least one condition")
+    return None, query_filter
+
+# ✅ Route to delete many students by ids or filter
+@router.post("/students/bulk/delete")
+async def bulk_delete_students(body: BulkSelection):
+    ids, query_filter = _selection(body)
+    return await delete_students(ids, query_filter)
+
+# ✅ Route to set the same fields on many students
+@router.post("/students/bulk/update")
+async def bulk_update_students(body: BulkUpdate):
+    ids, query_filter = _selection(body)
+    changes = body.changes.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    try:
+        return await update_students(changes, ids, query_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ✅ Route to move whole classes up, e.g. [{"from_class": "9", "to_class": "10"}, ...]
+@router.post("/students/bulk/promote")
+async def promote_students(body: PromotionRequest):
+    scope = build_student_filter(**body.filter.model_dump()) if body.filter else {}
+    groups = []
+    for promotion in body.promotions:
+        class_filter = build_student_filter(student_class=promotion.from_class)
+        groups.append(({"$and": [class_filter, scope]} if scope else class_filter, {"student_class": promotion.to_class}))
+    counts = await update_student_groups(groups)
+    return {
+        "updated": sum(counts),
+        "results": [
+            {"from_class": promotion.from_class, "to_class": promotion.to_class, "updated": count}
+            for promotion, count in zip(body.promotions, counts)
+        ],
+    }
+
+# ✅ Route to insert or update students keyed by name and date of birth
+@router.post("/students/bulk/upsert")
+async def bulk_upsert_students(body: BulkUpsert):
+    results = await upsert_students([student.model_dump(exclude_none=True) for student in body.students])
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": results}
+
 @router.get("/students/marks")
 async def get_student_marks():
-    students = collection.find({}, {"name": 1, "marks": 1})  # Fetch only names and marks
+    students = await get_student_fields("name", "marks")  # Fetch only names and marks
     student_list = [{"name": student["name"], "marks": student.get("marks", 0)} for student in students]
     return student_list
 
 @router.get("/students/gender")
 async def get_student_gender():
-    students = collection.find({}, {"name": 1, "gender": 1})  # Fetch only names and marks
+    students = await get_student_fields("name", "gender")  # Fetch only names and genders
     student_list = [{"name": student["name"], "gender": student.get("gender", 0)} for student in students]
     return student_list
 
 @router.get("/students/student_class")
 async def get_student_class():
-    students = collection.find({}, {"name": 1, "student_class": 1, "_id": 0})  # Exclude _id
+    students = await get_student_fields("name", "student_class")  # Exclude _id
     student_list = [{"name": student["name"], "student_class": student.get("student_class", "Unknown")} for student in students]
     
-    return student_list
\ No newline at end of file
+    return student_list
+
+
+# ✅ Aggregated chart data, computed in the database
+@router.get("/students/stats/gender")
+async def get_gender_stats():
+    return await stats.count_by_gender()
+
+@router.get("/students/stats/class")
+async def get_class_stats():
+    return await stats.count_by_class()
+
+@router.get("/students/stats/marks")
+async def get_marks_histogram(bucket_width: int = Query(100, gt=0)):
+    return await stats.marks_histogram(bucket_width)
+
+@router.get("/students/stats/class-marks")
+async def get_class_marks_summary(percentiles: str = Query("0.25,0.5,0.75,0.9")):
+    try:
+        values = tuple(float(p) for p in percentiles.split(",") if p.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be numbers between 0 and 1")
+    if any(p < 0 or p > 1 for p in values):
+        raise HTTPException(status_code=400, detail="Percentiles must be numbers between 0 and 1")
+    return await stats.class_marks_summary(values)
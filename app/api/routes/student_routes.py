@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Request, Form, HTTPException
 from bson import ObjectId
 from fastapi.templating import Jinja2Templates
-from core.database.db import collection
- # Import MongoDB collection
+from app.api.core.database.db import get_student_fields, add_student_to_db, delete_student_from_db
+ # Import MongoDB data-access helpers
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
 # Route to display students
 @router.get("/")
-def get_students(request: Request):
-    students = list(collection.find({}, {"_id": 1, "name": 1, "student_class": 1, "dob": 1, "gender": 1, "city": 1}))
+async def get_students(request: Request):
+    students = await get_student_fields("name", "student_class", "dob", "gender", "city", include_id=True)
     for student in students:
-        student["id"] = str(student["_id"])  # Convert ObjectId to string
+        student["id"] = student["_id"]
     return templates.TemplateResponse("index.html", {"request": request, "students": students})
 
 # Route to add a student
@@ -31,17 +31,16 @@ async def add_student(
         "gender": gender,
         "city": city
     }
-    result = collection.insert_one(student_data)
-    return {"message": "Student added successfully", "id": str(result.inserted_id)}
+    student_id = await add_student_to_db(student_data)
+    return {"message": "Student added successfully", "id": student_id}
 
 
 # Route to delete a student
 @router.post("/delete/{student_id}")
-def delete_student(student_id: str):
-    if not collection.find_one({"_id": ObjectId(student_id)}):
+async def delete_student(student_id: str):
+    if not await delete_student_from_db(student_id):
         raise HTTPException(status_code=404, detail="Student not found")
 
-    collection.delete_one({"_id": ObjectId(student_id)})
     return {"message": "Student deleted successfully"}
 
 # Route to add a student
@@ -65,7 +64,7 @@ async def add_student(
         "city": city,
         "marks": marks
     }
-    result = collection.insert_one(student_data)
-    return {"message": "Student added successfully", "id": str(result.inserted_id)}
+    student_id = await add_student_to_db(student_data)
+    return {"message": "Student added successfully", "id": student_id}
 
 
@@ -18,11 +18,11 @@ document.addEventListener("DOMContentLoaded", function () {
     // Function to append messages to the chatbox
     function appendMessage(sender, message, isError = false) {
         const messageClass = sender === "You" ? "text-blue-600" : isError ? "text-red-500" : "text-gray-700";
-        chatbox.innerHTML += `
+        chatbox.insertAdjacentHTML("beforeend", `
             <div class="mb-2">
                 <p class="${messageClass}"><strong>${sender}:</strong> ${message}</p>
             </div>
-        `;
+        `); // Keeps any streaming message elements attached
         chatbox.scrollTop = chatbox.scrollHeight; // Auto-scroll
     }
 
@@ -37,29 +37,89 @@ document.addEventListener("DOMContentLoaded", function () {
         appendMessage("You", userMessage);
         userInput.value = ""; // Clear input
 
-        let apiUrl = "http://127.0.0.1:8000/chatbot";
+        let apiUrl = "/chatbot/stream";
         let options = {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ message: userMessage }),
         };
 
-        // ✅ If the query is about PDF, use `/ask` (GET request)
+        // ✅ If the query is about PDF, use `/ask/stream` (GET request)
         if (userMessage.toLowerCase().includes("pdf") || userMessage.toLowerCase().includes("summarize")) {
-            apiUrl = `http://127.0.0.1:8000/ask?query=${encodeURIComponent(userMessage)}`;
+            apiUrl = `/ask/stream?query=${encodeURIComponent(userMessage)}`;
             options = { method: "GET" }; // GET request doesn't need a body
         }
 
+        const reply = createBotMessage();
         try {
-            console.log(`📨 Sending request to ${apiUrl}...`);
+            console.log(`📨 Streaming from ${apiUrl}...`);
             const response = await fetch(apiUrl, options);
-            const data = await response.json();
-            console.log("✅ Response received:", data);
-
-            appendMessage("Bot", data.response || data.reply || "❌ No response received.", !data.response && !data.reply);
+            if (!response.ok || !response.body) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            await readEventStream(response, (event, data) => {
+                if (event === "error") {
+                    reply.append(data.error || "❌ No response received.", true);
+                } else if (event === "result") {
+                    reply.append(typeof data.response === "string" ? data.response : JSON.stringify(data.response));
+                } else if (data.token) {
+                    reply.append(data.token);
+                }
+            });
+            if (!reply.text()) {
+                reply.append("❌ No response received.", true);
+            }
         } catch (error) {
             console.error("❌ Error fetching response:", error);
-            appendMessage("Bot", "❌ Error connecting to chatbot.", true);
+            reply.append("❌ Error connecting to chatbot.", true);
+        }
+    }
+
+    // Adds an empty bot message that streamed tokens are appended to
+    function createBotMessage() {
+        const wrapper = document.createElement("div");
+        wrapper.className = "mb-2";
+        const line = document.createElement("p");
+        line.className = "text-gray-700";
+        line.innerHTML = "<strong>Bot:</strong> ";
+        const body = document.createElement("span");
+        line.appendChild(body);
+        wrapper.appendChild(line);
+        chatbox.appendChild(wrapper);
+        return {
+            append(text, isError = false) {
+                if (isError) line.className = "text-red-500";
+                body.textContent += text;
+                chatbox.scrollTop = chatbox.scrollHeight; // Auto-scroll
+            },
+            text() {
+                return body.textContent;
+            },
+        };
+    }
+
+    // Parses a text/event-stream response and calls onEvent(event, data) per event
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = "message";
+                let data = "";
+                rawEvent.split("\n").forEach(line => {
+                    if (line.startsWith("event: ")) event = line.slice(7);
+                    else if (line.startsWith("data: ")) data += line.slice(6);
+                });
+                if (event === "done") return;
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
         }
     }
 
@@ -102,7 +162,12 @@ document.addEventListener("DOMContentLoaded", function () {
         .then(response => response.json())
         .then(data => {
             console.log("✅ File uploaded successfully:", data);
-            appendMessage("Bot", `📂 File "${file.name}" uploaded successfully!`);
+            if (!data.job_id) {
+                appendMessage("Bot", data.detail || data.error || "❌ Error uploading file.", true);
+                return;
+            }
+            appendMessage("Bot", `📂 File "${file.name}" uploaded, processing...`);
+            pollJob(data.job_id, file.name);
         })
         .catch(error => {
             console.error("❌ File upload error:", error);
@@ -110,6 +175,23 @@ document.addEventListener("DOMContentLoaded", function () {
         });
     }
 
+    // Poll a background job until it finishes
+    async function pollJob(jobId, label) {
+        try {
+            const response = await fetch(`/jobs/${jobId}`);
+            const job = await response.json();
+            if (job.status === "succeeded") {
+                appendMessage("Bot", `✅ "${label}": ${job.message}`);
+            } else if (job.status === "failed" || job.status === "cancelled") {
+                appendMessage("Bot", `❌ "${label}": ${job.error || job.message}`, true);
+            } else {
+                setTimeout(() => pollJob(jobId, label), 1000);
+            }
+        } catch (error) {
+            console.error("❌ Job polling error:", error);
+        }
+    }
+
     // Attach event listener for file uploads
     fileUpload.addEventListener("change", handleFileUpload);
 });
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.api.core import web_fetch
+from app.api.core.web_fetch import FetchError, fetch_page_text, html_to_text
+
+ARTICLE = b"""<html><head><title>t</title><script>var p = "<p>no</p>";</script></head><body>
+<nav><p>Navigation</p></nav>
+<div id="mw-content-text"><div><p>First <b>main</b> paragraph.</p></div><p>Second   paragraph.</p></div>
+<footer><p>Footer</p></footer>
+</body></html>"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the routes in `self.server.pages` and records request headers."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        body, etag, declare_length = page
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+        if declare_length:
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            self.close_connection = True  # Body ends when the connection closes
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.pages, httpd.requests = {}, []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def url_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(web_fetch, "URL_CACHE_DIRECTORY", str(tmp_path / "url_cache"))
+
+
+def fetch(url):
+    """Runs one fetch on a fresh event loop; the pooled client is bound to the loop, so close it after."""
+    async def run():
+        try:
+            return await fetch_page_text(url)
+        finally:
+            await web_fetch.close_http_client()
+    return asyncio.run(run())
+
+
+def test_revalidates_with_etag_and_serves_cached_text_on_304(server):
+    server.pages["/article"] = (ARTICLE, '"v1"', True)
+
+    first = fetch(server.url + "/article")
+    assert first.text == "First main paragraph.\n\nSecond paragraph."
+    assert not first.not_modified
+
+    second = fetch(server.url + "/article")
+    assert second.not_modified
+    assert second.text == first.text
+    assert server.requests[1][1].get("If-None-Match") == '"v1"'
+
+
+def test_changed_page_is_downloaded_again(server):
+    server.pages["/article"] = (ARTICLE, '"v1"', True)
+    fetch(server.url + "/article")
+    server.pages["/article"] = (b"<article><p>Updated.</p></article>", '"v2"', True)
+
+    result = fetch(server.url + "/article")
+    assert not result.not_modified
+    assert result.text == "Updated."
+
+
+@pytest.mark.parametrize("declare_length", [True, False])
+def test_rejects_pages_over_the_size_cap(server, monkeypatch, declare_length):
+    monkeypatch.setattr(web_fetch, "URL_FETCH_MAX_BYTES", 1024)
+    server.pages["/big"] = (b"<p>" + b"x" * 4096 + b"</p>", None, declare_length)
+
+    with pytest.raises(FetchError, match="larger than 1024 bytes"):
+        fetch(server.url + "/big")
+
+
+def test_http_errors_raise_fetch_error(server):
+    with pytest.raises(FetchError):
+        fetch(server.url + "/missing")
+
+
+def test_html_to_text_uses_the_main_content_block():
+    assert html_to_text(ARTICLE.decode()) == "First main paragraph.\n\nSecond paragraph."
+
+
+def test_html_to_text_prefers_the_first_article():
+    html = "<p>Intro</p><article><p>Body &amp; more</p><div><p>Nested</p></div></article><p>Aside</p>"
+    assert html_to_text(html) == "Body & more\n\nNested"
+
+
+def test_html_to_text_falls_back_to_every_paragraph():
+    html = "<body><p>One</p><style>p { color: red }</style><div><p>Two <i>words</i></p></div><p>  </p></body>"
+    assert html_to_text(html) == "One\n\nTwo words"